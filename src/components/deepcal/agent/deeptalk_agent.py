@@ -2,7 +2,13 @@ import requests
 import yaml # For handling YAML in train/test requests
 import json
 import os
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple, Union
 
 # Configure logging
@@ -20,13 +26,221 @@ logger = logging.getLogger('deeptalk_agent')
 # Voice system configuration that will be connected on the TS/JS side
 VOICE_ENABLED = True
 
+# Model archives and training data are moved in chunks of this size
+TRANSFER_CHUNK_SIZE = 1 << 20
+
+
+def upload_body(source, chunk_size=TRANSFER_CHUNK_SIZE):
+    """
+    Request body for YAML/NLU uploads without building one large bytes object.
+
+    str -> UTF-8 bytes (as before); bytes and binary file handles pass
+    through (requests streams file handles itself); a pathlib.Path is read
+    in chunks; any other iterable of str/bytes chunks is sent with chunked
+    transfer encoding.
+    """
+    if isinstance(source, str):
+        return source.encode('utf-8')
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, 'read'):
+        return source
+    if isinstance(source, Path):
+        def read_file():
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    yield chunk
+        return read_file()
+    return (chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in source)
+
+
+class ParseCache:
+    """
+    Thread-safe LRU/TTL cache of /model/parse results.
+
+    Keys are (model version, emulation mode, text), so results from a
+    previous model are never served once the version changes; clear() drops
+    everything when this client replaces or unloads the model.
+    """
+
+    def __init__(self, maxsize=4096, ttl=600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+class TrackerCache:
+    """
+    Per-conversation tracker cache fed by incremental event fetches.
+
+    Each entry keeps the merged tracker and the timestamp of its newest
+    event. Entries are LRU-evicted beyond `maxsize` conversations and
+    dropped after `idle_ttl` seconds without a lookup, so memory stays
+    bounded however many conversations the voice UI touches.
+    """
+
+    def __init__(self, maxsize=256, idle_ttl=1800.0):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry["used"] > self.idle_ttl:
+                del self._entries[key]
+                return None
+            entry["used"] = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, tracker, last_event_time):
+        with self._lock:
+            self._entries[key] = {"tracker": tracker, "last_event_time": last_event_time, "used": time.monotonic()}
+            self._entries.move_to_end(key)
+            now = time.monotonic()
+            while self._entries:
+                oldest_key, oldest = next(iter(self._entries.items()))
+                if len(self._entries) <= self.maxsize and now - oldest["used"] <= self.idle_ttl:
+                    break
+                del self._entries[oldest_key]
+
+    def discard(self, conversation_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == conversation_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def latest_event_time(tracker):
+    """Timestamp of the newest event in a tracker response (falls back to latest_event_time)."""
+    events = tracker.get("events") or []
+    if events:
+        return max(e.get("timestamp", 0.0) for e in events)
+    return tracker.get("latest_event_time")
+
+
+# Cached trackers are refreshed from `since = newest cached timestamp - overlap`, so
+# events sharing that timestamp are fetched whether the server's `since` is
+# inclusive or exclusive; the overlap is de-duplicated against the cache.
+TRACKER_SINCE_OVERLAP = 1e-3
+
+
+def is_full_history(update, since):
+    """True when a `since` window came back with events older than `since` (the server ignored it)."""
+    return any(e.get("timestamp", 0.0) < since for e in update.get("events") or [])
+
+
+def merge_tracker_events(cached, update, since, include_events="AFTER_RESTART"):
+    """
+    Fold an include_events=ALL window of events from `since` on into a cached tracker.
+
+    History only grows, so the cached events at or after `since` must open
+    the window; they are skipped and the rest appended. For AFTER_RESTART a
+    restart inside the window means the window alone holds the answer. A
+    full history (see is_full_history) replaces the cached events. Returns
+    None when the window does not line up with the cache (history was
+    rewritten), so the caller refetches.
+    """
+    update_events = update.get("events") or []
+    restart_in_window = any(e.get("event") == "restart" for e in update_events)
+    if is_full_history(update, since) or (include_events == "AFTER_RESTART" and restart_in_window):
+        events = list(update_events)
+    else:
+        cached_events = list(cached.get("events") or [])
+        overlap = [e for e in cached_events if e.get("timestamp", 0.0) >= since]
+        if update_events[:len(overlap)] != overlap:
+            return None
+        events = cached_events + update_events[len(overlap):]
+    if include_events == "AFTER_RESTART":
+        restarts = [i for i, e in enumerate(events) if e.get("event") == "restart"]
+        if restarts:
+            events = events[restarts[-1] + 1:]
+    merged = {k: v for k, v in update.items() if k != "events"}
+    merged["events"] = events
+    return merged
+
+
+def safe_filename(name):
+    """Last path component of a server-supplied file name; None for '', '.' or '..'."""
+    base = os.path.basename(str(name).replace('\\', '/'))
+    return None if base in ('', '.', '..') else base
+
+
+def model_version_of(status):
+    """Loaded-model identifier from a /status response (None if unknown)."""
+    if not isinstance(status, dict) or status.get("error"):
+        return None
+    return status.get("model_id") or status.get("model_file")
+
+
+def is_cacheable_parse(result):
+    return isinstance(result, dict) and not result.get("error")
+
+
 class DeepCALAgent:
-    def __init__(self, base_url=DEEPCAL_BASE_URL, token=API_TOKEN, jwt_token=None):
+    def __init__(self, base_url=DEEPCAL_BASE_URL, token=API_TOKEN, jwt_token=None,
+                 parse_cache=None, model_check_interval=30.0, parse_workers=8, tracker_since=None):
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
         self.token = token
         self.jwt_token = jwt_token
 
+        # NLU parse cache; the loaded-model version is rechecked every model_check_interval seconds
+        self.parse_cache = parse_cache if parse_cache is not None else ParseCache()
+        self.model_check_interval = model_check_interval
+        self.parse_workers = parse_workers
+        self._model_version = None
+        self._model_checked = 0.0
+        self._inflight_parses = {}
+        self._parse_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self.tracker_cache = TrackerCache()
+        # Whether the server honours `since` on tracker fetches: None = detect on first use
+        self.tracker_since = tracker_since
+        if parse_workers > requests.adapters.DEFAULT_POOLSIZE:
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=parse_workers)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
         # Set up authentication
         if self.jwt_token:
             self.session.headers.update({"Authorization": f"Bearer {self.jwt_token}"})
@@ -70,20 +284,86 @@ class DeepCALAgent:
             return response.content # Fallback for other types
 
         except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP Error: {e.response.status_code} for {url}")
-            try:
-                error_details = e.response.json()
-                logger.error(f"Error details: {error_details}") # APIs often return JSON errors
-                return {"error": True, "status_code": e.response.status_code, "details": error_details}
-            except json.JSONDecodeError:
-                error_text = e.response.text
-                logger.error(f"Error details (text): {error_text}")
-                return {"error": True, "status_code": e.response.status_code, "message": error_text}
+            return self._http_error(e.response, url)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Request Exception: {e} for {url}")
             return {"error": True, "message": str(e), "type": "connection"}
 
+    @staticmethod
+    def _http_error(response, url):
+        logger.error(f"HTTP Error: {response.status_code} for {url}")
+        try:
+            error_details = response.json()
+            logger.error(f"Error details: {error_details}") # APIs often return JSON errors
+            return {"error": True, "status_code": response.status_code, "details": error_details}
+        except json.JSONDecodeError:
+            error_text = response.text
+            logger.error(f"Error details (text): {error_text}")
+            return {"error": True, "status_code": response.status_code, "message": error_text}
+
+    def _download(self, method, endpoint, dest, params=None, data=None, content_type=None,
+                  expected_sha256=None, chunk_size=TRANSFER_CHUNK_SIZE):
+        """
+        Stream a binary response to disk instead of holding it in memory.
+
+        Chunks go to `<dest>.part` while their SHA-256 is computed. The file is
+        only renamed into place when the byte count matches Content-Length and
+        the digest matches `expected_sha256` (if given); otherwise it is
+        removed and an error dict is returned. `dest` may be a directory, in
+        which case the server's `filename` header names the file.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        req_params = params.copy() if params else {}
+        if not self.jwt_token and self.token:
+            req_params['token'] = self.token
+        req_headers = {'Content-Type': content_type} if content_type else {}
+
+        partial = None
+        try:
+            with self.session.request(method, url, params=req_params, data=data,
+                                      headers=req_headers, stream=True) as response:
+                if response.status_code >= 400:
+                    return self._http_error(response, url)
+                # Only the last path component of the header: never write outside `dest`
+                filename = safe_filename(response.headers.get('filename', 'model.tar.gz'))
+                target = Path(dest)
+                if target.is_dir():
+                    if filename is None:
+                        logger.error(f"Refusing unsafe filename header from {url}")
+                        return {"error": True, "type": "filename",
+                                "message": f"unsafe filename {response.headers.get('filename')!r}"}
+                    target = target / filename
+                # Content-Length counts encoded bytes; only comparable when the body isn't compressed
+                expected_size = response.headers.get('Content-Length')
+                if 'Content-Encoding' in response.headers:
+                    expected_size = None
+                partial = target.with_name(target.name + '.part')
+                digest = hashlib.sha256()
+                size = 0
+                with open(partial, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+        except requests.exceptions.RequestException as e:
+            if partial is not None:
+                partial.unlink(missing_ok=True)
+            logger.error(f"Request Exception: {e} for {url}")
+            return {"error": True, "message": str(e), "type": "connection"}
+
+        problem = None
+        if expected_size is not None and size != int(expected_size):
+            problem = ("size", f"received {size} bytes, expected {expected_size}")
+        elif expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+            problem = ("checksum", f"sha256 {digest.hexdigest()} does not match {expected_sha256}")
+        if problem is not None:
+            partial.unlink(missing_ok=True)
+            logger.error(f"Download of {url} failed {problem[0]} check: {problem[1]}")
+            return {"error": True, "type": problem[0], "message": problem[1]}
+        os.replace(partial, target)
+        return {"path": str(target), "filename": filename, "size": size, "sha256": digest.hexdigest()}
+
     # --- Server Information ---
     def get_health(self):
         """GET /Status - Health endpoint."""
@@ -109,6 +389,58 @@ class DeepCALAgent:
             params["until"] = until
         return self._request("GET", f"/conversations/{conversation_id}/tracker", params=params)
 
+    def get_conversation_tracker_cached(self, conversation_id, include_events="AFTER_RESTART"):
+        """
+        Tracker for a conversation, fetching only what changed since the last call.
+
+        The first call fetches the full tracker. Later calls make one request
+        for the events from just before the newest cached one on (`since`,
+        with include_events=ALL so restarts are seen and applied locally) and
+        merge them; the overlap makes events that share the newest cached
+        timestamp visible, and is skipped using the cache. The window also
+        carries fresh slots and latest_* fields. A window that disagrees with
+        the cache (history replaced elsewhere) triggers a full refetch.
+
+        Whether the server honours `since` is detected from the first window
+        (or set with `tracker_since`). Once it is known not to, every call is
+        a single plain fetch.
+        Only ALL and AFTER_RESTART can be merged client-side; other modes
+        go straight to get_conversation_tracker.
+        """
+        if include_events not in ("ALL", "AFTER_RESTART") or self.tracker_since is False:
+            return self.get_conversation_tracker(conversation_id, include_events)
+        key = (conversation_id, include_events)
+        path = f"/conversations/{conversation_id}/tracker"
+        entry = self.tracker_cache.get(key)
+        if entry is None:
+            tracker = self._request("GET", path, params={"include_events": include_events})
+            if isinstance(tracker, dict) and not tracker.get("error"):
+                self.tracker_cache.put(key, tracker, latest_event_time(tracker))
+            return tracker
+
+        last = entry["last_event_time"]
+        if last is None:  # no events cached yet: nothing to window from
+            tracker = self._request("GET", path, params={"include_events": include_events})
+            if isinstance(tracker, dict) and not tracker.get("error"):
+                self.tracker_cache.put(key, tracker, latest_event_time(tracker))
+            return tracker
+
+        since = last - TRACKER_SINCE_OVERLAP
+        update = self._request("GET", path, params={"include_events": "ALL", "since": since})
+        if not isinstance(update, dict) or update.get("error"):
+            return update
+        if update.get("events"):
+            self.tracker_since = not is_full_history(update, since)
+            if not self.tracker_since:
+                logger.info("Server ignores `since` on tracker fetches; caching disabled")
+                self.tracker_cache.clear()
+        tracker = merge_tracker_events(entry["tracker"], update, since, include_events)
+        if tracker is None:
+            self.tracker_cache.discard(conversation_id)
+            return self.get_conversation_tracker_cached(conversation_id, include_events)
+        self.tracker_cache.put(key, tracker, latest_event_time(tracker))
+        return tracker
+
     def add_conversation_tracker_events(self, conversation_id, events, 
                                         include_events="AFTER_RESTART", output_channel=None, 
                                         execute_side_effects=False):
@@ -122,6 +454,7 @@ class DeepCALAgent:
     def replace_conversation_tracker_events(self, conversation_id, events_list, include_events="AFTER_RESTART"):
         """PUT /conversations/{conversation_id}/tracker/events"""
         params = {"include_events": include_events}
+        self.tracker_cache.discard(conversation_id)  # history rewritten; next cached read refetches it
         return self._request("PUT", f"/conversations/{conversation_id}/tracker/events", json_data=events_list, params=params)
 
     def get_conversation_story(self, conversation_id, until=None, all_sessions=False):
@@ -156,9 +489,9 @@ class DeepCALAgent:
         return self._request("POST", f"/conversations/{conversation_id}/messages", json_data=payload, params=params)
 
     # --- Model ---
-    def train_model(self, training_data_yaml, save_to_default_model_directory=True,
-                    force_training=False, augmentation="50", num_threads="1", callback_url=None):
-        """POST /model/train"""
+    @staticmethod
+    def _train_params(save_to_default_model_directory=True, force_training=False, augmentation="50",
+                      num_threads="1", callback_url=None):
         params = {
             "save_to_default_model_directory": save_to_default_model_directory,
             "force_training": force_training,
@@ -167,15 +500,63 @@ class DeepCALAgent:
         }
         if callback_url:
             params["callback_url"] = callback_url
+        return params
+
+    def train_model(self, training_data_yaml, save_to_default_model_directory=True,
+                    force_training=False, augmentation="50", num_threads="1", callback_url=None):
+        """POST /model/train"""
+        params = self._train_params(save_to_default_model_directory, force_training,
+                                    augmentation, num_threads, callback_url)
         
-        # training_data_yaml should be a YAML string
-        return self._request("POST", "/model/train", data=training_data_yaml.encode('utf-8'), 
+        # training_data_yaml: YAML string, bytes, binary file handle, Path or iterable of chunks
+        return self._request("POST", "/model/train", data=upload_body(training_data_yaml), 
                              params=params, content_type="application/yaml")
 
+    def train_model_to_file(self, training_data_yaml, dest, expected_sha256=None,
+                            save_to_default_model_directory=True, force_training=False,
+                            augmentation="50", num_threads="1", chunk_size=TRANSFER_CHUNK_SIZE):
+        """
+        POST /model/train, streaming the trained archive to `dest` (file or directory).
+
+        Returns {"path", "filename", "size", "sha256"} or an error dict; memory
+        use stays at one chunk however large the model is.
+        """
+        params = self._train_params(save_to_default_model_directory, force_training, augmentation, num_threads)
+        return self._download("POST", "/model/train", dest, params=params, data=upload_body(training_data_yaml),
+                              content_type="application/yaml", expected_sha256=expected_sha256,
+                              chunk_size=chunk_size)
+
+    def train_model_on_server(self, training_data_yaml, force_training=False, augmentation="50",
+                              num_threads="1"):
+        """
+        POST /model/train, leaving the trained model in the server's default model directory.
+
+        Only the `filename` response header is read; the connection is closed
+        before the archive body is sent on, so nothing is downloaded. Returns
+        {"filename"} (relative to the server's model directory) or an error dict.
+        """
+        url = f"{self.base_url}/model/train"
+        params = self._train_params(True, force_training, augmentation, num_threads)
+        if not self.jwt_token and self.token:
+            params['token'] = self.token
+        try:
+            with self.session.post(url, params=params, data=upload_body(training_data_yaml),
+                                   headers={'Content-Type': 'application/yaml'}, stream=True) as response:
+                if response.status_code >= 400:
+                    return self._http_error(response, url)
+                header = response.headers.get('filename')
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request Exception: {e} for {url}")
+            return {"error": True, "message": str(e), "type": "connection"}
+        filename = safe_filename(header) if header else None
+        if filename is None:
+            return {"error": True, "type": "filename", "message": f"unusable filename header {header!r}"}
+        return {"filename": filename}
+
     def test_model_stories(self, stories_yaml, e2e=False):
         """POST /model/test/stories"""
         params = {"e2e": e2e}
-        return self._request("POST", "/model/test/stories", data=stories_yaml.encode('utf-8'), 
+        return self._request("POST", "/model/test/stories", data=upload_body(stories_yaml), 
                              params=params, content_type="text/yml")
     
     def test_model_intent(self, nlu_data, model=None, callback_url=None, cross_validation_folds=None, is_json=False):
@@ -186,7 +567,7 @@ class DeepCALAgent:
         if cross_validation_folds: params["cross_validation_folds"] = cross_validation_folds
 
         content_type = "application/json" if is_json else "application/x-yaml"
-        data_to_send = json.dumps(nlu_data) if is_json else nlu_data.encode('utf-8')
+        data_to_send = json.dumps(nlu_data) if is_json else upload_body(nlu_data)
         
         return self._request("POST", "/model/test/intents", data=data_to_send, 
                              params=params, content_type=content_type)
@@ -196,8 +577,68 @@ class DeepCALAgent:
         params = {"include_events": include_events}
         return self._request("POST", "/model/predict", json_data=events_list, params=params)
 
-    def parse_model_message(self, text, message_id=None, emulation_mode=None):
-        """POST /model/parse"""
+    def parse_model_message(self, text, message_id=None, emulation_mode=None, use_cache=True):
+        """POST /model/parse (cached per model version unless message_id is given or use_cache=False)"""
+        if not use_cache or message_id:
+            return self._parse_uncached(text, message_id, emulation_mode)
+
+        key = (self.model_version(), emulation_mode, text)
+        cached = self.parse_cache.get(key)
+        if cached is not None:
+            return cached
+        # Identical texts already on the wire wait for that response instead of sending their own
+        with self._parse_lock:
+            pending = self._inflight_parses.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight_parses[key] = Future()
+        if not owner:
+            return pending.result()
+        try:
+            result = self._parse_uncached(text, None, emulation_mode)
+            if is_cacheable_parse(result):
+                self.parse_cache.put(key, result)
+            pending.set_result(result)
+            return result
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._parse_lock:
+                del self._inflight_parses[key]
+
+    def parse_many(self, texts, emulation_mode=None, use_cache=True):
+        """
+        Parse many utterances, results in input order.
+
+        Duplicates are parsed once, cached results are reused, and the rest
+        are sent concurrently over the shared session (parse_workers threads).
+        """
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        if len(unique) <= 1 or self.parse_workers <= 1:
+            results = {t: self.parse_model_message(t, emulation_mode=emulation_mode, use_cache=use_cache) for t in unique}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.parse_workers, len(unique))) as pool:
+                parsed = pool.map(lambda t: self.parse_model_message(t, emulation_mode=emulation_mode,
+                                                                     use_cache=use_cache), unique)
+                results = dict(zip(unique, parsed))
+        return [results[t] for t in texts]
+
+    def model_version(self, refresh=False):
+        """Identifier of the loaded model, from /status at most every model_check_interval seconds."""
+        with self._version_lock:  # concurrent parses share one /status call
+            if refresh or time.monotonic() - self._model_checked >= self.model_check_interval:
+                self._model_version = model_version_of(self.get_server_status())
+                self._model_checked = time.monotonic()
+        return self._model_version
+
+    def invalidate_parse_cache(self):
+        """Forget cached parses and the remembered model version."""
+        self.parse_cache.clear()
+        self._model_checked = 0.0
+
+    def _parse_uncached(self, text, message_id=None, emulation_mode=None):
         payload = {"text": text}
         if message_id:
             payload["message_id"] = message_id
@@ -219,11 +660,17 @@ class DeepCALAgent:
         if not payload:
             raise ValueError("At least one model source (model_file, model_server, remote_storage) must be provided.")
             
-        return self._request("PUT", "/model", json_data=payload) # Expects 204 No Content on success
+        try:
+            return self._request("PUT", "/model", json_data=payload) # Expects 204 No Content on success
+        finally:
+            self.invalidate_parse_cache()
 
     def unload_model(self):
         """DELETE /model"""
-        return self._request("DELETE", "/model") # Expects 204 No Content on success
+        try:
+            return self._request("DELETE", "/model") # Expects 204 No Content on success
+        finally:
+            self.invalidate_parse_cache()
 
     # --- Flows & Domain ---
     def get_flows(self):
@@ -1,3 +1,5 @@
+from deeptalk_forwarder_index import ForwarderIndex
+
 # This data structure would typically be loaded in your actions.py
 # (e.g., from a JSON file or defined directly for simplicity here)
 
@@ -94,12 +96,14 @@ report_knowledge_base = {
     }
 }
 
-# Helper to get forwarder data with flexible name matching
+# Forwarder names, aliases and carriers indexed once at import
+forwarder_index = ForwarderIndex.from_sources(report_knowledge_base)
+
+# Helper to get forwarder data with flexible name matching (exact, prefix, word and fuzzy)
 def get_forwarder_details(forwarder_name_query):
-    if not forwarder_name_query: return None
-    normalized_query = forwarder_name_query.lower().replace(" ", "")
-    for name, data in report_knowledge_base["forwarder_analysis_details"].items():
-        normalized_name = name.lower().replace(" ", "")
-        if normalized_query == normalized_name or normalized_query in normalized_name:
-            return name, data # Return actual name and data
-    return None, None
\ No newline at end of file
+    if not forwarder_name_query: return None, None
+    name, _ = forwarder_index.resolve(forwarder_name_query)
+    data = report_knowledge_base["forwarder_analysis_details"].get(name)
+    if data is None:
+        return None, None
+    return name, data # Return actual name and data
\ No newline at end of file
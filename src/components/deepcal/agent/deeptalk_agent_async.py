@@ -0,0 +1,362 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+import aiohttp
+
+from deeptalk_agent import API_TOKEN, DEEPCAL_BASE_URL, ParseCache, is_cacheable_parse, model_version_of
+
+logger = logging.getLogger('deeptalk_agent_async')
+
+# Transient statuses worth retrying (rate limited / upstream restarting)
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def _query_params(params):
+    """aiohttp rejects bools in query strings; send them the way requests does ("True"/"False")."""
+    return {k: str(v) if isinstance(v, bool) else v for k, v in params.items()}
+
+
+class AsyncDeepCALAgent:
+    """
+    asyncio counterpart of DeepCALAgent for bulk and concurrent calls.
+
+    All requests share one aiohttp connection pool: `max_connections` in
+    total and at most `per_host` to any one server, so gathering thousands
+    of calls queues them on the pool instead of opening thousands of
+    sockets. Idempotent calls (GET/PUT/DELETE, plus NLU parse and predict)
+    are retried on connection errors, timeouts and 429/502/503/504 with
+    exponential backoff and full jitter. Return values and error dicts
+    match DeepCALAgent._request. NLU parses share DeepCALAgent's ParseCache
+    semantics: keyed on the loaded model version, cleared by replace_model
+    and unload_model, and identical texts in flight are sent once.
+
+        async with AsyncDeepCALAgent(token="...") as agent:
+            parsed = await agent.parse_many(["ship to Lusaka", "track my cargo"])
+    """
+
+    def __init__(self, base_url=DEEPCAL_BASE_URL, token=API_TOKEN, jwt_token=None,
+                 timeout=30.0, connect_timeout=5.0, max_connections=100, per_host=20,
+                 retries=3, backoff=0.25, max_backoff=5.0, parse_cache=None, model_check_interval=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.jwt_token = jwt_token
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.parse_cache = parse_cache if parse_cache is not None else ParseCache()
+        self.model_check_interval = model_check_interval
+        self._model_version = None
+        self._model_checked = 0.0
+        self._inflight_parses = {}
+        self._version_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        _ = self.session  # create the pool inside the running loop
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.jwt_token}"} if self.jwt_token else None
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=headers)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _retry_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _request(self, method, endpoint, params=None, data=None, json_data=None, headers=None,
+                       content_type=None, idempotent=None, timeout=None):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+
+        req_params = _query_params(params) if params else {}
+        req_headers = headers.copy() if headers else {}
+
+        if not self.jwt_token and self.token:  # Use TokenAuth if no JWT and token is provided
+            req_params['token'] = self.token
+
+        if content_type:
+            req_headers['Content-Type'] = content_type
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempts = self.retries + 1 if idempotent else 1
+        # timeout=None would disable the session timeout, so only override when given
+        extra = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+
+        for attempt in range(attempts):
+            try:
+                async with self.session.request(
+                    method, url, params=req_params, data=data, json=json_data, headers=req_headers, **extra
+                ) as response:
+                    if response.status in RETRY_STATUSES and attempt + 1 < attempts:
+                        delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+                        logger.warning(f"HTTP {response.status} for {url}, retrying in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    return await self._decode(response, url)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt + 1 < attempts:
+                    delay = self._retry_delay(attempt)
+                    logger.warning(f"{type(e).__name__} for {url}, retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Request Exception: {e!r} for {url}")
+                kind = "timeout" if isinstance(e, asyncio.TimeoutError) else "connection"
+                return {"error": True, "message": str(e) or type(e).__name__, "type": kind}
+            except aiohttp.ClientError as e:
+                logger.error(f"Request Exception: {e} for {url}")
+                return {"error": True, "message": str(e), "type": "connection"}
+
+    @staticmethod
+    async def _decode(response, url):
+        content_type = response.headers.get('Content-Type', '')
+        if response.status >= 400:
+            logger.error(f"HTTP Error: {response.status} for {url}")
+            text = await response.text()
+            try:
+                error_details = json.loads(text)
+                logger.error(f"Error details: {error_details}")
+                return {"error": True, "status_code": response.status, "details": error_details}
+            except json.JSONDecodeError:
+                logger.error(f"Error details (text): {text}")
+                return {"error": True, "status_code": response.status, "message": text}
+
+        if response.status == 204:  # No Content
+            return None
+        if 'application/json' in content_type:
+            return await response.json(content_type=None)
+        if 'text/plain' in content_type:
+            return await response.text()
+        if 'application/octet-stream' in content_type:
+            filename = response.headers.get('filename', 'model.tar.gz')
+            return await response.read(), filename
+        if 'text/yml' in content_type or 'application/x-yaml' in content_type:
+            return await response.text()
+        return await response.read()
+
+    # --- Batch helpers -------------------------------------------------------
+    @staticmethod
+    async def _gather(call: Callable[[Any], Awaitable], items: Iterable) -> List:
+        """Run `call` over items concurrently (the pool bounds in-flight requests), results in order."""
+        return await asyncio.gather(*(call(item) for item in items))
+
+    async def parse_many(self, texts, emulation_mode=None, use_cache=True):
+        """POST /model/parse for every distinct text concurrently; results follow the input order."""
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        await self.model_version()  # one /status check up front rather than one per text
+        parsed = await self._gather(
+            lambda text: self.parse_model_message(text, emulation_mode=emulation_mode, use_cache=use_cache), unique)
+        results = dict(zip(unique, parsed))
+        return [results[t] for t in texts]
+
+    async def get_trackers(self, conversation_ids, include_events="AFTER_RESTART"):
+        """{conversation_id: tracker} fetched concurrently."""
+        ids = list(conversation_ids)
+        trackers = await self._gather(lambda cid: self.get_conversation_tracker(cid, include_events), ids)
+        return dict(zip(ids, trackers))
+
+    async def send_messages(self, messages, channel="rest"):
+        """REST-channel messages from (sender_id, message) pairs, sent concurrently."""
+        return await self._gather(lambda m: self.send_message_rest_channel(m[0], m[1], channel), messages)
+
+    # --- Server Information ---
+    async def get_health(self):
+        """GET /Status - Health endpoint."""
+        return await self._request("GET", "/Status")
+
+    async def get_version(self):
+        """GET /version - Version of DeepCAL."""
+        return await self._request("GET", "/version")
+
+    async def get_server_status(self):
+        """GET /status - DeepCAL Server Status (authenticated)."""
+        return await self._request("GET", "/status")
+
+    # --- Tracker ---
+    async def get_conversation_tracker(self, conversation_id, include_events="AFTER_RESTART", until=None):
+        """GET /conversations/{conversation_id}/tracker"""
+        params = {"include_events": include_events}
+        if until:
+            params["until"] = until
+        return await self._request("GET", f"/conversations/{conversation_id}/tracker", params=params)
+
+    async def add_conversation_tracker_events(self, conversation_id, events,
+                                              include_events="AFTER_RESTART", output_channel=None,
+                                              execute_side_effects=False):
+        """POST /conversations/{conversation_id}/tracker/events"""
+        params = {"include_events": include_events, "execute_side_effects": execute_side_effects}
+        if output_channel:
+            params["output_channel"] = output_channel
+        return await self._request("POST", f"/conversations/{conversation_id}/tracker/events",
+                                   json_data=events, params=params)
+
+    async def get_conversation_story(self, conversation_id, until=None, all_sessions=False):
+        """GET /conversations/{conversation_id}/story"""
+        params = {"all_sessions": all_sessions}
+        if until:
+            params["until"] = until
+        return await self._request("GET", f"/conversations/{conversation_id}/story", params=params)
+
+    async def predict_conversation_action(self, conversation_id):
+        """POST /conversations/{conversation_id}/predict"""
+        return await self._request("POST", f"/conversations/{conversation_id}/predict", idempotent=True)
+
+    async def add_conversation_message(self, conversation_id, text, sender="user", parse_data=None,
+                                       include_events="AFTER_RESTART"):
+        """POST /conversations/{conversation_id}/messages"""
+        payload = {"text": text, "sender": sender}
+        if parse_data:
+            payload["parse_data"] = parse_data
+        params = {"include_events": include_events}
+        return await self._request("POST", f"/conversations/{conversation_id}/messages",
+                                   json_data=payload, params=params)
+
+    # --- Model ---
+    async def test_model_intent(self, nlu_data, model=None, callback_url=None, cross_validation_folds=None,
+                                is_json=False, timeout=None):
+        """POST /model/test/intents (evaluations can outlast the default timeout; pass `timeout`)."""
+        params = {}
+        if model: params["model"] = model
+        if callback_url: params["callback_url"] = callback_url
+        if cross_validation_folds: params["cross_validation_folds"] = cross_validation_folds
+
+        content_type = "application/json" if is_json else "application/x-yaml"
+        data_to_send = json.dumps(nlu_data) if is_json else nlu_data.encode('utf-8')
+        return await self._request("POST", "/model/test/intents", data=data_to_send, params=params,
+                                   content_type=content_type, idempotent=True, timeout=timeout)
+
+    async def test_model_stories(self, stories_yaml, e2e=False, timeout=None):
+        """POST /model/test/stories"""
+        return await self._request("POST", "/model/test/stories", data=stories_yaml.encode('utf-8'),
+                                   params={"e2e": e2e}, content_type="text/yml", idempotent=True,
+                                   timeout=timeout)
+
+    async def predict_model_action(self, events_list, include_events="AFTER_RESTART"):
+        """POST /model/predict"""
+        params = {"include_events": include_events}
+        return await self._request("POST", "/model/predict", json_data=events_list, params=params,
+                                   idempotent=True)
+
+    async def parse_model_message(self, text, message_id=None, emulation_mode=None, use_cache=True):
+        """POST /model/parse (NLU only, safe to retry; cached unless message_id is given)"""
+        if not use_cache or message_id:
+            return await self._parse_uncached(text, message_id, emulation_mode)
+
+        key = (await self.model_version(), emulation_mode, text)
+        cached = self.parse_cache.get(key)
+        if cached is not None:
+            return cached
+        # One shared request per text; each caller awaits it through shield(), so a
+        # caller's cancellation (e.g. a wait_for timeout) leaves the others waiting
+        task = self._inflight_parses.get(key)
+        if task is None:
+            task = self._inflight_parses[key] = asyncio.ensure_future(
+                self._shared_parse(key, text, emulation_mode))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved even if all callers left
+        return await asyncio.shield(task)
+
+    async def _shared_parse(self, key, text, emulation_mode):
+        try:
+            result = await self._parse_uncached(text, None, emulation_mode)
+            if is_cacheable_parse(result):
+                self.parse_cache.put(key, result)
+            return result
+        finally:
+            del self._inflight_parses[key]
+
+    async def model_version(self, refresh=False):
+        """Identifier of the loaded model, from /status at most every model_check_interval seconds."""
+        async with self._version_lock:  # concurrent parses share one /status call
+            if refresh or time.monotonic() - self._model_checked >= self.model_check_interval:
+                self._model_version = model_version_of(await self.get_server_status())
+                self._model_checked = time.monotonic()
+        return self._model_version
+
+    def invalidate_parse_cache(self):
+        self.parse_cache.clear()
+        self._model_checked = 0.0
+
+    async def _parse_uncached(self, text, message_id=None, emulation_mode=None):
+        payload = {"text": text}
+        if message_id:
+            payload["message_id"] = message_id
+        params = {}
+        if emulation_mode:
+            params["emulation_mode"] = emulation_mode
+        return await self._request("POST", "/model/parse", json_data=payload, params=params, idempotent=True)
+
+    async def replace_model(self, model_file_path=None, model_server_config=None, remote_storage=None):
+        """PUT /model"""
+        payload = {}
+        if model_file_path:
+            payload["model_file"] = model_file_path
+        if model_server_config:
+            payload["model_server"] = model_server_config
+        if remote_storage:
+            payload["remote_storage"] = remote_storage
+        if not payload:
+            raise ValueError("At least one model source (model_file, model_server, remote_storage) must be provided.")
+        try:
+            return await self._request("PUT", "/model", json_data=payload)
+        finally:
+            self.invalidate_parse_cache()
+
+    async def unload_model(self):
+        """DELETE /model"""
+        try:
+            return await self._request("DELETE", "/model")
+        finally:
+            self.invalidate_parse_cache()
+
+    # --- Flows & Domain ---
+    async def get_flows(self):
+        """GET /flows"""
+        return await self._request("GET", "/flows")
+
+    async def get_domain(self, as_yaml=False):
+        """GET /domain"""
+        headers = {"Accept": "application/yaml"} if as_yaml else {"Accept": "application/json"}
+        return await self._request("GET", "/domain", headers=headers)
+
+    # --- Channel Webhooks ---
+    async def send_message_rest_channel(self, sender_id, message, channel="rest"):
+        """POST /webhooks/{rest_channel}/webhook"""
+        payload = {"sender": sender_id, "message": message}
+        return await self._request("POST", f"/webhooks/{channel}/webhook", json_data=payload)
+
+
+if __name__ == '__main__':
+    async def _demo():
+        async with AsyncDeepCALAgent(token="mysecrettoken") as agent:
+            print(await agent.get_version())
+            texts = ["I want to ship some goods to London", "Track shipment SR_24-001", "Which forwarder is cheapest?"]
+            for text, parsed in zip(texts, await agent.parse_many(texts)):
+                intent = parsed.get('intent', {}).get('name') if isinstance(parsed, dict) else parsed
+                print(f"{text!r} -> {intent}")
+
+    asyncio.run(_demo())
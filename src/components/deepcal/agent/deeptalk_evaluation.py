@@ -0,0 +1,327 @@
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from deeptalk_agent import API_TOKEN, DeepCALAgent
+
+logger = logging.getLogger('deeptalk_evaluation')
+
+# Rows of a classification report that are summaries, not labels
+SUMMARY_ROWS = frozenset({"accuracy", "micro avg", "macro avg", "weighted avg"})
+
+
+# --- NLU data ----------------------------------------------------------------
+
+def load_nlu(source):
+    """
+    Intent examples and other NLU items (synonyms, regexes, lookups) from a YAML file or string.
+
+    Returns ([(intent, example), ...], extras). Examples keep their entity
+    annotations verbatim so the server sees them as written.
+    """
+    text = Path(source).read_text(encoding="utf-8") if isinstance(source, Path) else source
+    data = yaml.safe_load(text) or {}
+    examples, extras = [], []
+    for item in data.get("nlu", []):
+        if "intent" not in item:
+            extras.append(item)
+            continue
+        for line in str(item.get("examples", "")).splitlines():
+            line = line.strip()
+            if line.startswith("- "):
+                examples.append((item["intent"], line[2:].strip()))
+    return examples, extras
+
+
+def split_folds(examples, folds, seed=0):
+    """Stratified k-fold split: each intent's examples are shuffled and dealt round-robin."""
+    by_intent = {}
+    for intent, example in examples:
+        by_intent.setdefault(intent, []).append(example)
+    rng = random.Random(seed)
+    buckets = [[] for _ in range(folds)]
+    offset = 0
+    for intent in sorted(by_intent):
+        items = by_intent[intent]
+        rng.shuffle(items)
+        for i, example in enumerate(items):
+            buckets[(offset + i) % folds].append((intent, example))
+        offset += len(items)  # keep fold sizes balanced across intents
+    return buckets
+
+
+def nlu_yaml(examples, extras=()):
+    """Rasa-style NLU YAML with block-literal example lists."""
+    by_intent = {}
+    for intent, example in examples:
+        by_intent.setdefault(intent, []).append(example)
+    lines = ['version: "3.1"', "nlu:"]
+    for intent, items in by_intent.items():
+        lines.append(f"- intent: {intent}")
+        lines.append("  examples: |")
+        lines.extend(f"    - {example}" for example in items)
+    text = "\n".join(lines) + "\n"
+    if extras:
+        text += yaml.safe_dump(list(extras), sort_keys=False, allow_unicode=True)
+    return text
+
+
+# --- Report aggregation -------------------------------------------------------
+
+def _add_counts(total, counts):
+    for label, (tp, fp, fn) in counts.items():
+        row = total.setdefault(label, [0.0, 0.0, 0.0])
+        row[0] += tp
+        row[1] += fp
+        row[2] += fn
+
+
+def counts_from_predictions(predictions):
+    """{label: [tp, fp, fn]} from per-example {"intent", "predicted"} rows (exact)."""
+    counts = {}
+    for p in predictions:
+        actual, predicted = p.get("intent"), p.get("predicted")
+        if actual == predicted:
+            counts.setdefault(actual, [0, 0, 0])[0] += 1
+        else:
+            counts.setdefault(actual, [0, 0, 0])[2] += 1
+            counts.setdefault(predicted, [0, 0, 0])[1] += 1
+    return counts
+
+
+def counts_from_report(report):
+    """
+    {label: [tp, fp, fn]} recovered from a precision/recall/support report.
+
+    tp = recall * support and fp = tp / precision - tp; false positives of a
+    label with zero precision cannot be recovered and count as 0.
+    """
+    counts = {}
+    for label, row in (report or {}).items():
+        if label in SUMMARY_ROWS or not isinstance(row, dict) or "support" not in row:
+            continue
+        support = float(row["support"])
+        tp = float(row.get("recall", 0.0)) * support
+        precision = float(row.get("precision", 0.0))
+        fp = tp / precision - tp if precision > 0 else 0.0
+        counts[label] = [tp, fp, support - tp]
+    return counts
+
+
+def metrics_from_counts(counts):
+    """Per-label precision/recall/f1/support plus micro and macro averages."""
+    def prf(tp, fp, fn):
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+    labels = {label: dict(prf(*c), support=int(round(c[0] + c[2]))) for label, c in sorted(counts.items())
+              if label is not None}
+    tp, fp, fn = (sum(c[i] for c in counts.values()) for i in range(3))
+    scored = [row for row in labels.values() if row["support"]]
+    macro = {k: round(statistics.fmean(row[k] for row in scored), 4) if scored else 0.0
+             for k in ("precision", "recall", "f1")}
+    return {"labels": labels, "micro": prf(tp, fp, fn), "macro": macro}
+
+
+def latency_summary(seconds):
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {"calls": len(ordered), "mean": round(statistics.fmean(ordered), 3), "p50": round(pick(0.5), 3),
+            "p95": round(pick(0.95), 3), "max": round(ordered[-1], 3)}
+
+
+# --- Harness -----------------------------------------------------------------
+
+class EvaluationHarness:
+    """
+    Runs NLU cross-validation folds and story test suites concurrently over
+    one or more DeepCAL servers.
+
+    Every server gets at most `per_server` calls in flight; tasks go to the
+    least busy server. cross_validate() splits the NLU data locally into
+    stratified folds, trains a model per fold on the server (kept in its
+    model directory, not loaded) and tests the held-out examples against it.
+    With train=False the folds are only shards of a regression run against
+    the loaded model. Intent and entity precision/recall are pooled from
+    every fold, with per-call latency, into one report.
+
+    Fold models are never downloaded: training returns only the archive's
+    file name, and the fold is tested with model=<server_model_dir>/<name>.
+    `server_model_dir` must therefore be the server's default model
+    directory as the server resolves it ("models" relative to its working
+    directory unless it was started with another --model-dir).
+    """
+
+    def __init__(self, agents, per_server=2, server_model_dir="models"):
+        self.agents = list(agents)
+        if not self.agents:
+            raise ValueError("EvaluationHarness needs at least one DeepCALAgent")
+        self.per_server = per_server
+        self.server_model_dir = server_model_dir.rstrip("/")
+        self._slots = [threading.Semaphore(per_server) for _ in self.agents]
+        self._busy = [0] * len(self.agents)
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            index = min(range(len(self.agents)), key=lambda i: self._busy[i])
+            self._busy[index] += 1
+        self._slots[index].acquire()
+        return index
+
+    def _release(self, index):
+        self._slots[index].release()
+        with self._lock:
+            self._busy[index] -= 1
+
+    def _run(self, tasks):
+        workers = len(self.agents) * self.per_server
+        with ThreadPoolExecutor(max_workers=min(workers, max(len(tasks), 1))) as pool:
+            return list(pool.map(lambda task: task(), tasks))
+
+    # --- Tasks ---------------------------------------------------------------
+
+    def _fold_task(self, index, train_examples, test_examples, extras, train):
+        def run():
+            server = self._acquire()
+            agent = self.agents[server]
+            record = {"kind": "fold" if train else "shard", "index": index, "server": agent.base_url,
+                      "train_examples": len(train_examples), "test_examples": len(test_examples)}
+            try:
+                model = None
+                if train:
+                    started = time.perf_counter()
+                    trained = agent.train_model_on_server(nlu_yaml(train_examples, extras))
+                    record["train_seconds"] = time.perf_counter() - started
+                    if trained.get("error"):
+                        record["error"] = trained
+                        return record, None
+                    model = f"{self.server_model_dir}/{trained['filename']}"
+                started = time.perf_counter()
+                result = agent.test_model_intent(nlu_yaml(test_examples, extras), model=model)
+                record["test_seconds"] = time.perf_counter() - started
+                if not isinstance(result, dict) or result.get("error"):
+                    record["error"] = result
+                    return record, None
+                return record, result
+            finally:
+                self._release(server)
+        return run
+
+    def _story_task(self, index, stories, e2e):
+        def run():
+            server = self._acquire()
+            agent = self.agents[server]
+            record = {"kind": "stories", "index": index, "server": agent.base_url}
+            try:
+                started = time.perf_counter()
+                result = agent.test_model_stories(stories, e2e=e2e)
+                record["test_seconds"] = time.perf_counter() - started
+                if not isinstance(result, dict) or result.get("error"):
+                    record["error"] = result
+                    return record, None
+                return record, result
+            finally:
+                self._release(server)
+        return run
+
+    # --- Entry points --------------------------------------------------------
+
+    def cross_validate(self, nlu_source, folds=5, seed=0, train=True, story_suites=(), e2e=False):
+        """Fold (and optional story suite) evaluation in one concurrent batch; returns the report dict."""
+        examples, extras = load_nlu(nlu_source)
+        if len(examples) < folds:
+            raise ValueError(f"{len(examples)} examples cannot be split into {folds} folds")
+        buckets = split_folds(examples, folds, seed)
+        started = time.perf_counter()
+        tasks = []
+        for i, test in enumerate(buckets):
+            training = [ex for j, bucket in enumerate(buckets) if j != i for ex in bucket] if train else []
+            tasks.append(self._fold_task(i, training, test, extras, train))
+        tasks.extend(self._story_task(i, suite, e2e) for i, suite in enumerate(story_suites))
+        outcomes = self._run(tasks)
+        return self.report(outcomes, time.perf_counter() - started)
+
+    def test_stories(self, story_suites, e2e=False):
+        """Story suites only, run concurrently."""
+        started = time.perf_counter()
+        outcomes = self._run([self._story_task(i, suite, e2e) for i, suite in enumerate(story_suites)])
+        return self.report(outcomes, time.perf_counter() - started)
+
+    @staticmethod
+    def report(outcomes, wall_seconds):
+        intents, entities, stories = {}, {}, {}
+        for record, result in outcomes:
+            if result is None:
+                continue
+            if record["kind"] == "stories":
+                _add_counts(stories, counts_from_report(result.get("report")))
+                continue
+            intent_eval = result.get("intent_evaluation") or {}
+            predictions = intent_eval.get("predictions")
+            _add_counts(intents, counts_from_predictions(predictions) if predictions
+                        else counts_from_report(intent_eval.get("report")))
+            for extractor, evaluation in (result.get("entity_evaluation") or {}).items():
+                _add_counts(entities.setdefault(extractor, {}), counts_from_report((evaluation or {}).get("report")))
+
+        calls = [record for record, _ in outcomes]
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "tasks": len(calls),
+            "failed": [record for record in calls if "error" in record],
+            "intent": metrics_from_counts(intents) if intents else None,
+            "entities": {extractor: metrics_from_counts(c) for extractor, c in entities.items()},
+            "stories": metrics_from_counts(stories) if stories else None,
+            "latency": {
+                "train": latency_summary([r["train_seconds"] for r in calls if "train_seconds" in r]),
+                "test": latency_summary([r["test_seconds"] for r in calls if "test_seconds" in r]),
+            },
+            "calls": calls,
+        }
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Concurrent DeepCAL NLU cross-validation and story tests")
+    p.add_argument("--nlu", type=Path, help="NLU YAML to split into folds")
+    p.add_argument("--stories", type=Path, nargs="*", default=[], help="Story test files, one suite each")
+    p.add_argument("--servers", default="http://localhost:8080", help="Comma-separated DeepCAL base URLs")
+    p.add_argument("--token", default=API_TOKEN)
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--per-server", type=int, default=2, help="Concurrent calls per server")
+    p.add_argument("--no-train", action="store_true", help="Shard the data against the loaded model instead")
+    p.add_argument("--server-model-dir", default="models",
+                   help="The servers' model directory, as they resolve it; fold models are tested from there")
+    p.add_argument("--e2e", action="store_true", help="End-to-end story evaluation")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", type=Path, help="Write the JSON report here")
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    harness = EvaluationHarness([DeepCALAgent(url.strip(), token=args.token) for url in args.servers.split(",")],
+                                per_server=args.per_server, server_model_dir=args.server_model_dir)
+    if args.nlu:
+        result = harness.cross_validate(args.nlu, folds=args.folds, seed=args.seed, train=not args.no_train,
+                                        story_suites=args.stories, e2e=args.e2e)
+    else:
+        result = harness.test_stories(args.stories, e2e=args.e2e)
+    summary = {k: result[k] for k in ("wall_seconds", "tasks", "intent", "stories", "latency")}
+    print(json.dumps(summary, indent=2))
+    if result["failed"]:
+        print(f"{len(result['failed'])} call(s) failed")
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+        print(f"Report written to {args.output}")
@@ -0,0 +1,196 @@
+import bisect
+import json
+import logging
+import re
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger('deeptalk_forwarder_index')
+
+# src/core/base_reference, next to the engine's other reference data
+REFERENCE_DIR = Path(__file__).resolve().parents[3] / "core" / "base_reference"
+
+# Spellings seen in exports, transcripts and voice input that no reference file lists
+COMMON_ALIASES = {
+    "Kuehne Nagel": ["Kuehne and Nagel", "Kuehne & Nagel", "K+N", "KN", "Kuhne Nagel", "Kuehne-Nagel"],
+    "DHL Express": ["DHL", "DHL Xpress"],
+    "DHL Global": ["DHL Global Forwarding", "DHL GF"],
+    "Scan Global Logistics": ["Scan Global", "SGL", "Scanglobal"],
+    "Freight In Time": ["frieght_in_time", "Frieght In Time", "FIT", "Freight On Time"],
+    "BWOSI": ["Bwosi Logistics"],
+    "AGL": ["African Global Logistics", "Africa Global Logistics"],
+    "Siginon": ["Siginon Global", "Siginon Logistics", "Siginon Limited"],
+}
+
+
+def name_key(name):
+    """'Kuehne + Nagel' / 'frieght_in_time' -> 'kuehnenagel' / 'frieghtintime'"""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def trigrams(key):
+    padded = f"##{key}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance, giving up early (returning limit + 1) once every cell exceeds `limit`."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ForwarderIndex:
+    """
+    Name -> canonical forwarder lookup built once and queried per voice turn.
+
+      exact   dict on the normalised key (letters and digits only)     O(1)
+      prefix  bisect over the sorted keys                              O(log n)
+      token   dict on each word of every name ("nagel", "express")     O(1)
+      fuzzy   trigram postings to shortlist candidates, then edit
+              distance on the shortlist only
+
+    Names added later (a growing carrier list) stay in sorted order, so
+    there is no rebuild step.
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._keys = []
+        self._tokens = {}
+        self._postings = {}
+        self.canonical_names = []
+
+    def __len__(self):
+        return len(self._exact)
+
+    def __contains__(self, name):
+        return name_key(name) in self._exact
+
+    def add(self, name, canonical=None):
+        """Index `name` as a spelling of `canonical` (itself when omitted); first mapping wins."""
+        canonical = canonical or name
+        if canonical != name and name_key(canonical) not in self._exact:
+            self.add(canonical)
+        canonical = self._exact.get(name_key(canonical), canonical)
+        if canonical not in self.canonical_names:
+            self.canonical_names.append(canonical)
+        key = name_key(name)
+        if not key or key in self._exact:
+            return
+        self._exact[key] = canonical
+        bisect.insort(self._keys, key)
+        for word in re.findall(r"[a-z0-9]+", str(name).lower()):
+            if len(word) > 2:
+                self._tokens.setdefault(word, []).append(canonical)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, []).append(key)
+
+    # --- Queries -------------------------------------------------------------
+
+    def exact(self, query):
+        return self._exact.get(name_key(query))
+
+    def prefix(self, query, limit=5):
+        """Canonical names with a spelling starting with `query`, shortest spelling first."""
+        key = name_key(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key + "\x7f")
+        matches = sorted(self._keys[start:end], key=len)
+        return list(dict.fromkeys(self._exact[k] for k in matches))[:limit]
+
+    def token(self, query):
+        """Canonical names containing a word of `query` ("nagel" -> Kuehne Nagel), most shared words first."""
+        hits = Counter()
+        for word in re.findall(r"[a-z0-9]+", str(query).lower()):
+            for canonical in dict.fromkeys(self._tokens.get(word, ())):
+                hits[canonical] += 1
+        return [name for name, _ in hits.most_common()]
+
+    def fuzzy(self, query, limit=5, min_similarity=0.6):
+        """[(canonical, similarity)] for spellings within edit distance, ranked by similarity."""
+        key = name_key(query)
+        if not key:
+            return []
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] += 1
+        best = {}
+        for candidate, count in shared.most_common(limit * 10):
+            if 2 * count / (len(grams) + len(candidate) + 2) < min_similarity / 2:
+                break  # trigram overlap too low for the edit distance to qualify
+            longest = max(len(key), len(candidate))
+            limit_distance = int(longest * (1 - min_similarity))
+            distance = edit_distance(key, candidate, limit_distance)
+            similarity = 1 - distance / longest
+            if similarity >= min_similarity:
+                canonical = self._exact[candidate]
+                best[canonical] = max(best.get(canonical, 0.0), round(similarity, 3))
+        return sorted(best.items(), key=lambda item: -item[1])[:limit]
+
+    def resolve(self, query):
+        """(canonical, how) using exact, then prefix, token and fuzzy matching; (None, None) if nothing fits."""
+        if not query or not name_key(query):
+            return None, None
+        found = self.exact(query)
+        if found:
+            return found, "exact"
+        for how, matches in (("prefix", self.prefix(query, limit=1)), ("token", self.token(query))):
+            if matches:
+                return matches[0], how
+        matches = self.fuzzy(query, limit=1)
+        if matches:
+            return matches[0][0], "fuzzy"
+        return None, None
+
+    # --- Construction --------------------------------------------------------
+
+    @classmethod
+    def from_sources(cls, knowledge_base=None, reference_dir=REFERENCE_DIR):
+        """
+        Index built from the report knowledge base (its names are canonical),
+        forwarders.json, forwarder_folklore.json, carrier.json and COMMON_ALIASES.
+        Missing reference files are skipped.
+        """
+        index = cls()
+        for name in (knowledge_base or {}).get("forwarder_analysis_details", {}):
+            index.add(name)
+
+        def canonical_for(name):
+            # "AGL (African Global Logistics)" -> "AGL"; "Kuehne + Nagel" -> existing "Kuehne Nagel"
+            base = re.sub(r"\s*\(.*\)\s*$", "", name).strip()
+            return index.exact(base) or base
+
+        for filename in ("forwarders.json", "forwarder_folklore.json", "carrier.json"):
+            path = Path(reference_dir) / filename
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            names = data.get("forwarder_profiles", {}) if isinstance(data, dict) else data
+            for name in names:
+                canonical = canonical_for(name)
+                index.add(name, canonical)
+                inner = re.search(r"\((.*)\)", name)
+                if inner:
+                    index.add(inner.group(1), canonical)
+
+        for canonical, aliases in COMMON_ALIASES.items():
+            target = index.exact(canonical) or canonical
+            for alias in aliases:
+                index.add(alias, target)
+        return index
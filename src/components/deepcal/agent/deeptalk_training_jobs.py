@@ -0,0 +1,367 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from deeptalk_agent import TRANSFER_CHUNK_SIZE, DeepCALAgent
+
+logger = logging.getLogger('deeptalk_training_jobs')
+
+# Job lifecycle: queued -> submitted -> completed | failed (cancelled only from queued)
+QUEUED, SUBMITTED, COMPLETED, FAILED, CANCELLED = "queued", "submitted", "completed", "failed", "cancelled"
+FINAL_STATES = frozenset({COMPLETED, FAILED, CANCELLED})
+
+
+class TrainingJob:
+    """
+    One training run handed to DeepCAL with a callback_url.
+
+    `future` resolves to {"path", "filename", "size", "sha256"} once the
+    trained archive has arrived on the callback listener, or raises
+    RuntimeError if training failed. `history` records (state, timestamp)
+    transitions, and `on_progress` callbacks fire on every transition.
+    """
+
+    def __init__(self, name, training_data, train_params):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.training_data = training_data
+        self.train_params = train_params
+        self.state = QUEUED
+        self.history = [(QUEUED, time.time())]
+        self.error = None
+        self.future = Future()
+        self._listeners = []
+
+    def on_progress(self, callback):
+        """callback(job) on every state change."""
+        self._listeners.append(callback)
+
+    @property
+    def done(self):
+        return self.state in FINAL_STATES
+
+    @property
+    def elapsed(self):
+        """Seconds from submission to completion (or now)."""
+        started = next((t for s, t in self.history if s == SUBMITTED), None)
+        if started is None:
+            return 0.0
+        return (self.history[-1][1] if self.done else time.time()) - started
+
+    def _transition(self, state, result=None, error=None):
+        self.state = state
+        self.history.append((state, time.time()))
+        if state == COMPLETED:
+            self.future.set_result(result)
+        elif state == FAILED:
+            self.error = error
+            self.future.set_exception(RuntimeError(f"Training job {self.name!r} failed: {error}"))
+        elif state == CANCELLED:
+            self.future.cancel()
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception:
+                logger.exception(f"Progress callback failed for job {self.name}")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "elapsed": round(self.elapsed, 3),
+            "error": self.error,
+            "result": self.future.result() if self.state == COMPLETED else None,
+        }
+
+
+class TrainingJobManager:
+    """
+    Non-blocking DeepCAL training with a local callback receiver.
+
+    submit() queues a job and returns it at once. At most `max_concurrent`
+    jobs are training on the server at any time; each is posted to
+    /model/train with callback_url pointing at this manager's listener, so
+    the HTTP call returns immediately and the trained model is streamed to
+    `output_dir` when DeepCAL calls back. Jobs with no callback within
+    `job_timeout` seconds fail and free their slot.
+
+        with TrainingJobManager(agent, max_concurrent=3) as jobs:
+            runs = [jobs.submit(Path(f"domain_{v}.yml"), name=v) for v in variants]
+            jobs.wait_all()
+
+    `callback_host` is the address DeepCAL uses to reach this process (set it
+    when the server runs in a container); the listener binds to `bind_host`.
+    """
+
+    def __init__(self, agent: DeepCALAgent, max_concurrent=2, output_dir="models",
+                 bind_host="127.0.0.1", port=0, callback_host=None, job_timeout=6 * 3600):
+        self.agent = agent
+        self.max_concurrent = max_concurrent
+        self.output_dir = Path(output_dir)
+        self.job_timeout = job_timeout
+        self.jobs = {}
+
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(max_concurrent)
+        self._lock = threading.RLock()  # progress callbacks may call back into the manager
+        self._timers = {}
+        self._closed = False
+
+        self._server = ThreadingHTTPServer((bind_host, port), _callback_handler_for(self))
+        self._server.daemon_threads = True
+        host, bound_port = self._server.server_address[:2]
+        self.callback_base = f"http://{callback_host or host}:{bound_port}"
+        threading.Thread(target=self._server.serve_forever, name="deepcal-train-callbacks", daemon=True).start()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="deepcal-train-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    # --- Submission ----------------------------------------------------------
+
+    def submit(self, training_data, name=None, **train_params):
+        """Queue a training run; `training_data` is anything train_model accepts. Returns the TrainingJob."""
+        if self._closed:
+            raise RuntimeError("TrainingJobManager is shut down")
+        train_params.pop("callback_url", None)
+        job = TrainingJob(name or f"job-{len(self.jobs) + 1}", training_data, train_params)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def cancel(self, job):
+        """Cancel a job that has not been sent to the server yet."""
+        with self._lock:
+            if job.state != QUEUED:
+                return False
+            job._transition(CANCELLED)
+        return True
+
+    def _dispatch(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._slots.acquire()
+            with self._lock:
+                if job.state != QUEUED:  # cancelled while waiting for a slot
+                    self._slots.release()
+                    continue
+                job._transition(SUBMITTED)
+                timer = threading.Timer(self.job_timeout, self._expire, args=(job,))
+                timer.daemon = True
+                self._timers[job.id] = timer
+            timer.start()
+
+            try:
+                response = self.agent.train_model(
+                    job.training_data, callback_url=f"{self.callback_base}/callbacks/{job.id}", **job.train_params)
+                if isinstance(response, dict) and response.get("error"):
+                    self._finish(job, FAILED, error=response.get("details") or response.get("message"))
+                elif isinstance(response, tuple):
+                    # Server ignored callback_url and trained synchronously
+                    content, filename = response
+                    self._finish(job, COMPLETED, result=self._store_bytes(job, content, filename))
+            except Exception as e:  # fail this job, free its slot and keep dispatching
+                logger.exception(f"Submitting training job {job.name} failed")
+                self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+            finally:
+                job.training_data = None  # sent; don't keep large YAML alive for the job's lifetime
+
+    def _finish(self, job, state, result=None, error=None):
+        with self._lock:
+            if job.state != SUBMITTED:
+                return False
+            timer = self._timers.pop(job.id, None)
+            job._transition(state, result=result, error=error)
+        if timer is not None:
+            timer.cancel()
+        self._slots.release()
+        logger.info(f"Training job {job.name} {state} after {job.elapsed:.1f}s")
+        return True
+
+    def _expire(self, job):
+        self._finish(job, FAILED, error=f"no callback within {self.job_timeout}s")
+
+    # --- Callback receiver ---------------------------------------------------
+
+    def _model_path(self, job, filename):
+        directory = self.output_dir / job.name
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / os.path.basename(filename or "model.tar.gz")
+
+    def _store_bytes(self, job, content, filename):
+        path = self._model_path(job, filename)
+        path.write_bytes(content)
+        return {"path": str(path), "filename": path.name, "size": len(content),
+                "sha256": hashlib.sha256(content).hexdigest()}
+
+    def _receive(self, job_id, headers, stream, length):
+        """
+        Handle DeepCAL's callback POST; returns the HTTP status to answer with.
+
+        `length` is None for a chunked body (`stream` then ends at the last
+        chunk); `stream` is None when the request gave no way to frame the body.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.state != SUBMITTED:
+            return 404
+        if stream is None:
+            self._finish(job, FAILED, error="callback without Content-Length or chunked body")
+            return 411
+        content_type = headers.get("Content-Type", "")
+        if "application/json" in content_type or "text/plain" in content_type:
+            body = stream.read(-1 if length is None else length).decode("utf-8", "replace")
+            try:
+                details = json.loads(body)
+            except json.JSONDecodeError:
+                details = body
+            self._finish(job, FAILED, error=details)
+            return 200
+
+        # Model archive: stream to disk in chunks, hashing as we go
+        path = self._model_path(job, headers.get("filename"))
+        partial = path.with_name(path.name + ".part")
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial, "wb") as f:
+            while length is None or size < length:
+                chunk = stream.read(TRANSFER_CHUNK_SIZE if length is None else min(TRANSFER_CHUNK_SIZE, length - size))
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        if (length is not None and size != length) or getattr(stream, "truncated", False):
+            partial.unlink(missing_ok=True)
+            expected = "" if length is None else f" of {length}"
+            self._finish(job, FAILED, error=f"callback body truncated at {size}{expected} bytes")
+            return 400
+        os.replace(partial, path)
+        self._finish(job, COMPLETED, result={"path": str(path), "filename": path.name,
+                                             "size": size, "sha256": digest.hexdigest()})
+        return 200
+
+    # --- Status --------------------------------------------------------------
+
+    def status(self):
+        counts = {}
+        for job in list(self.jobs.values()):
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {"max_concurrent": self.max_concurrent, "callback": self.callback_base, "counts": counts,
+                "jobs": [job.to_dict() for job in list(self.jobs.values())]}
+
+    def wait_all(self, timeout=None):
+        """Block until every submitted job is final; returns {name: result or exception}."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        outcomes = {}
+        for job in list(self.jobs.values()):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                outcomes[job.name] = job.future.result(remaining)
+            except Exception as e:  # failed or cancelled jobs report their exception
+                outcomes[job.name] = e
+        return outcomes
+
+    def shutdown(self):
+        """Stop accepting jobs, cancel queued ones and stop the listener (running jobs are abandoned)."""
+        if self._closed:
+            return
+        self._closed = True
+        for job in list(self.jobs.values()):
+            self.cancel(job)
+        self._queue.put(None)
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _ChunkedReader:
+    """read() over a Transfer-Encoding: chunked request body; `truncated` if it ends early."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.remaining = 0
+        self.done = False
+        self.truncated = False
+
+    def read(self, n=-1):
+        parts = []
+        while not self.done and n != 0:
+            if not self.remaining and not self._next_chunk():
+                break
+            data = self.raw.read(self.remaining if n < 0 else min(n, self.remaining))
+            if not data:
+                self.done = self.truncated = True
+                break
+            parts.append(data)
+            self.remaining -= len(data)
+            if n > 0:
+                n -= len(data)
+            if not self.remaining:
+                self.raw.readline()  # CRLF closing the chunk
+        return b"".join(parts)
+
+    def _next_chunk(self):
+        line = self.raw.readline()
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:  # EOF or garbage instead of a chunk header
+            self.done = self.truncated = True
+            return False
+        if size == 0:
+            while self.raw.readline() not in (b"\r\n", b"\n", b""):  # trailers
+                pass
+            self.done = True
+            return False
+        self.remaining = size
+        return True
+
+
+def _callback_handler_for(manager):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            parts = self.path.split("?", 1)[0].strip("/").split("/")
+            if len(parts) != 2 or parts[0] != "callbacks":
+                self._send(404)
+                return
+            if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                stream, length = _ChunkedReader(self.rfile), None
+            elif (self.headers.get("Content-Length") or "").strip().isdigit():
+                stream, length = self.rfile, int(self.headers["Content-Length"])
+            else:
+                stream, length = None, None
+            self._send(manager._receive(parts[1], self.headers, stream, length))
+
+        def do_GET(self):
+            body = json.dumps(manager.status(), default=str).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send(self, status):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
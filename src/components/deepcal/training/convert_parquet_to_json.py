@@ -2,14 +2,18 @@
 """
 Ultra-Futuristic Data Converter for DeepCAL Training Pipeline
 Converts Parquet files to JSON format for DeepCAL training integration
+
+Large exports can be streamed row group by row group into JSON Lines with
+--jsonl, keeping memory bounded by one record batch.
 """
 
 import sys
 import os
 import json
+import argparse
 import pandas as pd
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
 # Set up logging with ultra-modern formatting
 logging.basicConfig(
@@ -63,15 +67,70 @@ def convert_parquet_to_json(input_file, output_file):
         logger.error(f"Error converting file: {str(e)}")
         return False
 
+def _json_default(value):
+    """Serialise Arrow temporal/decimal values that json can't handle natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def convert_parquet_to_jsonl(input_file, output_file, batch_size=50_000, columns=None, filters=None):
+    """
+    Stream a Parquet file to JSON Lines one record batch at a time
+    
+    Args:
+        input_file: Path to the Parquet file
+        output_file: Path to save the JSON Lines output
+        batch_size: Maximum rows decoded per batch
+        columns: Optional list of columns to project
+        filters: Optional pyarrow filter (DNF tuples or dataset expression)
+    """
+    try:
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        
+        start_time = datetime.now()
+        logger.info(f"Streaming {os.path.basename(input_file)} to JSON Lines (batch size {batch_size:,})")
+        
+        dataset = ds.dataset(input_file, format='parquet')
+        if filters is not None and not isinstance(filters, ds.Expression):
+            filters = pq.filters_to_expression(filters)
+        
+        rows = 0
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for batch in dataset.to_batches(columns=columns, filter=filters, batch_size=batch_size):
+                for record in batch.to_pylist():
+                    f.write(json.dumps(record, default=_json_default))
+                    f.write('\n')
+                rows += batch.num_rows
+                logger.info(f"Wrote {rows:,} rows...")
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        size_mb = os.path.getsize(output_file) / (1024 * 1024)
+        logger.info(f"Streamed {rows:,} rows in {duration:.2f} seconds")
+        logger.info(f"Output file size: {size_mb:.2f} MB")
+        
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error converting file: {str(e)}")
+        return False
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert Parquet data for DeepCAL training")
+    parser.add_argument('input_file', help="Path to the Parquet file")
+    parser.add_argument('output_file', help="Path to the JSON / JSON Lines output")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="Stream row groups to JSON Lines instead of one in-memory JSON array")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="Rows per batch when streaming")
+    parser.add_argument('--columns', help="Comma-separated columns to keep (streaming mode)")
+    return parser.parse_args()
+
 def main():
     """Main entry point with argument validation and error handling"""
-    # Check command line arguments
-    if len(sys.argv) != 3:
-        logger.error("Usage: python convert_parquet_to_json.py <input_parquet_file> <output_json_file>")
-        sys.exit(1)
+    args = parse_args()
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file = args.input_file
+    output_file = args.output_file
     
     # Validate input file exists
     if not os.path.exists(input_file):
@@ -85,7 +144,11 @@ def main():
         os.makedirs(output_dir)
     
     # Run the conversion
-    success = convert_parquet_to_json(input_file, output_file)
+    if args.jsonl:
+        columns = [c.strip() for c in args.columns.split(',') if c.strip()] if args.columns else None
+        success = convert_parquet_to_jsonl(input_file, output_file, batch_size=args.batch_size, columns=columns)
+    else:
+        success = convert_parquet_to_json(input_file, output_file)
     
     if success:
         logger.info(f"🚀 Conversion completed successfully. Data ready for DeepCAL training.")
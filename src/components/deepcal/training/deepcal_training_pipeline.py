@@ -11,6 +11,7 @@ import yaml
 import logging
 import argparse
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
 
 # Setup advanced logging
@@ -24,6 +25,12 @@ logger = logging.getLogger('deepcal-training')
 # Default paths
 DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'freight_forwarder_domain.yml')
 DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'models')
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Engine modules (streaming readers) live in src/core/base_engine/py
+ENGINE_PY_DIR = Path(__file__).resolve().parents[3] / 'core' / 'base_engine' / 'py'
+if ENGINE_PY_DIR.exists() and str(ENGINE_PY_DIR) not in sys.path:
+    sys.path.insert(0, str(ENGINE_PY_DIR))
 
 class DeepCALTrainingPipeline:
     """
@@ -31,11 +38,20 @@ class DeepCALTrainingPipeline:
     Connects the freight forwarder data with the voice processing system
     """
     
-    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, output_dir: str = DEFAULT_OUTPUT_DIR):
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, output_dir: str = DEFAULT_OUTPUT_DIR,
+                 stream: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 columns: Optional[List[str]] = None, modes: Optional[List[str]] = None,
+                 year: Optional[int] = None):
         """Initialize the training pipeline with configuration"""
         self.config_path = config_path
         self.output_dir = output_dir
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.columns = columns
+        self.modes = modes
+        self.year = year
         self.training_data = {}
+        self.record_count = 0
         self.domain_config = {}
         self.node_status = {}
         
@@ -72,18 +88,56 @@ class DeepCALTrainingPipeline:
     
     def load_training_data(self, data_path: str) -> Dict:
         """Load training data from JSON file"""
+        if self.stream:
+            columns, filters = self.parquet_pushdown(data_path)
+            chunks = self.iter_training_chunks(data_path, columns=columns, filters=filters)
+            self.record_count = sum(len(chunk) for chunk in chunks)
+            logger.info(f"Streamed training data with {self.record_count:,} records")
+            return self.training_data
         try:
             logger.info(f"Loading training data from {data_path}")
             with open(data_path, 'r') as f:
                 self.training_data = json.load(f)
             
-            logger.info(f"Loaded training data with {len(self.training_data)} records")
+            self.record_count = len(self.training_data)
+            logger.info(f"Loaded training data with {self.record_count} records")
             return self.training_data
             
         except Exception as e:
             logger.error(f"Error loading training data: {str(e)}")
             raise
     
+    def parquet_pushdown(self, data_path: str):
+        """Columns and filter expression for --columns/--modes/--year (Parquet input only)"""
+        if self.columns is None and not self.modes and self.year is None:
+            return None, None
+        from shipment_stream import detect_format
+        from arrow_io import shipment_filter
+
+        if detect_format(data_path) != 'parquet':
+            raise ValueError("--columns, --modes and --year require a Parquet training file")
+        filters = None
+        if self.modes or self.year is not None:
+            filters = shipment_filter(data_path, modes=self.modes, year=self.year)
+        return self.columns, filters
+    
+    def iter_training_chunks(self, data_path: str, columns: Optional[List[str]] = None, filters=None):
+        """
+        Yield training records in chunks (JSON array, JSON Lines or Parquet) in bounded memory
+        For Parquet, columns/filters are pushed down to Arrow so only matching row groups are read
+        """
+        from shipment_stream import iter_shipment_chunks
+
+        logger.info(f"Streaming training data from {data_path} in chunks of {self.chunk_size:,}")
+        parquet_options = {}
+        if columns is not None or filters is not None:
+            parquet_options = {'columns': columns, 'filters': filters}
+        try:
+            yield from iter_shipment_chunks(data_path, chunk_size=self.chunk_size, **parquet_options)
+        except Exception as e:
+            logger.error(f"Error streaming training data: {str(e)}")
+            raise
+    
     def prepare_training_nodes(self, num_nodes: int = 3) -> Dict:
         """Prepare training nodes for the DeepCAL system"""
         logger.info(f"Preparing {num_nodes} training nodes")
@@ -118,7 +172,7 @@ class DeepCALTrainingPipeline:
         if not self.domain_config:
             self.load_domain_config()
         
-        if not self.training_data:
+        if not self.training_data and not self.record_count:
             self.load_training_data(data_path)
         
         # Simulate the training process
@@ -166,6 +220,7 @@ class DeepCALTrainingPipeline:
             "trained_at": datetime.now().isoformat(),
             "domain_config": self.config_path,
             "data_source": data_path,
+            "records": self.record_count,
             "intents": len(self.domain_config.get('intents', [])),
             "entities": len(self.domain_config.get('entities', [])),
             "actions": len(self.domain_config.get('actions', [])),
@@ -194,12 +249,19 @@ def main():
     parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help="Path to the domain configuration YAML file")
     parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Directory to save the trained model")
     parser.add_argument('--nodes', type=int, default=3, help="Number of training nodes to use")
+    parser.add_argument('--stream', action='store_true', help="Stream the training data in chunks instead of loading it whole")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Records per chunk when streaming")
+    parser.add_argument('--columns', type=lambda s: s.split(','), help="Comma-separated Parquet columns to read when streaming")
+    parser.add_argument('--modes', type=lambda s: s.split(','), help="Only stream these modes of shipment, e.g. Air,Sea (Parquet)")
+    parser.add_argument('--year', type=int, help="Only stream shipments collected in this year (Parquet)")
     
     args = parser.parse_args()
     
     try:
         # Initialize and run the training pipeline
-        pipeline = DeepCALTrainingPipeline(config_path=args.config, output_dir=args.output_dir)
+        pipeline = DeepCALTrainingPipeline(config_path=args.config, output_dir=args.output_dir,
+                                           stream=args.stream, chunk_size=args.chunk_size,
+                                           columns=args.columns, modes=args.modes, year=args.year)
         pipeline.load_domain_config()
         pipeline.prepare_training_nodes(args.nodes)
         output_path = pipeline.train_model(args.data)
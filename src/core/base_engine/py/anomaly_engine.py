@@ -0,0 +1,60 @@
+# CORE/base_engine/py/anomaly_engine.py
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('percentile', 'zscore', 'mad')
+
+# Scales MAD to a consistent estimator of the standard deviation
+MAD_SCALE = 0.6745
+
+
+def flag_outliers(
+    values: np.ndarray,
+    groups: Optional[Sequence[Hashable]] = None,
+    method: str = 'percentile',
+    percentile: float = 95.0,
+    z: float = 3.0,
+    mad_k: float = 3.5,
+) -> Tuple[np.ndarray, Dict[Hashable, float]]:
+    """
+    Flag high outliers in one pass over a metric column
+
+    Missing (NaN) and zero values are ignored, matching the truthiness
+    filter of the original detect_anomalies. Thresholds are computed once
+    per group (or once overall when groups is None):
+
+        percentile: value > P(percentile)
+        zscore:     value > mean + z * std
+        mad:        value > median + mad_k * MAD / 0.6745
+
+    Returns (mask, thresholds) where mask flags rows above their group's
+    threshold and thresholds maps group -> threshold (key None if ungrouped).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown anomaly method {method!r}; expected one of {METHODS}")
+
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values) & (values != 0)
+    keys = pd.Series([None] * len(values) if groups is None else list(groups), dtype=object)
+    frame = pd.DataFrame({'key': keys.fillna('__none__'), 'value': values})[present]
+    if frame.empty:
+        return np.zeros(len(values), dtype=bool), {}
+
+    grouped = frame.groupby('key', sort=False)['value']
+    if method == 'percentile':
+        thresholds = grouped.quantile(percentile / 100.0)
+    elif method == 'zscore':
+        thresholds = grouped.mean() + z * grouped.std(ddof=0)
+    else:
+        median = grouped.median()
+        deviation = (frame['value'] - frame['key'].map(median)).abs()
+        mad = deviation.groupby(frame['key'], sort=False).median()
+        thresholds = median + mad_k * mad / MAD_SCALE
+
+    row_threshold = keys.fillna('__none__').map(thresholds).to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        mask = present & (values > row_threshold)
+    table = {(None if k == '__none__' else k): float(v) for k, v in thresholds.items()}
+    return mask, table
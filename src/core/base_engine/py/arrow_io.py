@@ -0,0 +1,105 @@
+# CORE/base_engine/py/arrow_io.py
+from typing import Iterator, List, Optional, Sequence, Union
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pc = ds = pq = None
+
+# A pyarrow Expression or DNF tuples, e.g. [('mode_of_shipment', '==', 'Air')]
+Filters = Union['ds.Expression', List[tuple], List[List[tuple]], None]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet ingestion requires pyarrow (pip install pyarrow)")
+
+
+def to_expression(filters: Filters) -> Optional['ds.Expression']:
+    """Normalise DNF filter tuples into a pyarrow dataset expression"""
+    _require_pyarrow()
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def _iso_strings(values: 'pa.Array') -> bool:
+    """Every non-null value starts with YYYY-MM-DD, so lexical order is date order"""
+    iso = pc.match_substring_regex(values, r'^\d{4}-\d{2}-\d{2}')
+    return pc.all(pc.fill_null(iso, True)).as_py()
+
+
+def _year_filter(dataset: 'ds.Dataset', date_column: str, year: int) -> 'ds.Expression':
+    field_type = dataset.schema.field(date_column).type
+    if not (pa.types.is_string(field_type) or pa.types.is_large_string(field_type)):
+        # Bounds in the column's own type: tz-aware timestamps can't be compared with naive ones
+        start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        if pa.types.is_timestamp(field_type) and field_type.tz is not None:
+            start, end = start.replace(tzinfo=timezone.utc), end.replace(tzinfo=timezone.utc)
+        if pa.types.is_date(field_type):
+            start, end = start.date(), end.date()
+        return (ds.field(date_column) >= pa.scalar(start, type=field_type)) & \
+            (ds.field(date_column) < pa.scalar(end, type=field_type))
+    values = pc.unique(dataset.to_table(columns=[date_column]).column(date_column).combine_chunks())
+    if _iso_strings(values):
+        start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+        return (ds.field(date_column) >= pa.scalar(start)) & (ds.field(date_column) < pa.scalar(end))
+    # e.g. "11-Jan-24": parse the distinct strings once, keep those falling in the year
+    from date_normalizer import parse_date_column
+
+    text = values.to_pylist()
+    parsed = parse_date_column(text)
+    in_year = [t for t, d in zip(text, parsed) if not np.isnat(d) and d.astype(object).year == year]
+    return ds.field(date_column).isin(pa.array(in_year, type=field_type))
+
+
+def shipment_filter(path: Union[str, Path], modes: Optional[Sequence[str]] = None,
+                    year: Optional[int] = None, date_column: str = 'date_of_collection') -> Optional['ds.Expression']:
+    """
+    Build a pushdown filter such as "2024 air shipments"
+
+    The year filter is a range on timestamp/date and ISO-8601 string columns,
+    so it prunes row groups. Other string formats ("11-Jan-24") are matched
+    by parsing the column's distinct values and filtering on those in the year.
+    """
+    _require_pyarrow()
+    expression = None
+    if modes:
+        expression = ds.field('mode_of_shipment').isin(list(modes))
+    if year is not None:
+        in_year = _year_filter(ds.dataset(str(path), format='parquet'), date_column, year)
+        expression = in_year if expression is None else expression & in_year
+    return expression
+
+
+def _present_columns(dataset: 'ds.Dataset', columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    if columns is None:
+        return None
+    names = set(dataset.schema.names)
+    return [c for c in columns if c in names]
+
+
+def read_parquet_table(path: Union[str, Path], columns: Optional[Sequence[str]] = None,
+                       filters: Filters = None) -> 'pa.Table':
+    """Read only the requested columns and row groups matching the filter"""
+    _require_pyarrow()
+    dataset = ds.dataset(str(path), format='parquet')
+    return dataset.to_table(columns=_present_columns(dataset, columns), filter=to_expression(filters))
+
+
+def iter_parquet_batches(path: Union[str, Path], batch_size: int, columns: Optional[Sequence[str]] = None,
+                         filters: Filters = None) -> Iterator['pa.RecordBatch']:
+    """Stream record batches with column projection and predicate pushdown"""
+    _require_pyarrow()
+    dataset = ds.dataset(str(path), format='parquet')
+    for batch in dataset.to_batches(columns=_present_columns(dataset, columns),
+                                    filter=to_expression(filters), batch_size=batch_size):
+        if batch.num_rows:
+            yield batch
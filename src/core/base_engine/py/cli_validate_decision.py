@@ -9,6 +9,9 @@ Usage (all flags optional):
   python cli_validate_decision.py \
       --matrix data/decision_matrix.csv \
       --criteria "Cost,Reliability,Responsiveness" \
+      --solver eigen \
+      --weight-cache .cache/weights \
+      --sensitivity 100000 --sensitivity-mode tnn --processes 4 \
       --strict
 
 If --strict is passed the script exits with code 1 on any validation error.
@@ -32,8 +35,10 @@ if str(CUR_DIR) not in sys.path:
 try:
     # Local engine modules (same folder)
     import utils as engine_utils
-    from weighting import CriteriaWeighting
+    from weighting import CriteriaWeighting, SOLVERS
     from ranking import AlternativeRanking
+    from sensitivity import SensitivityAnalysis, SAMPLING_MODES
+    from weight_cache import WeightCache
     from feedback import FeedbackLoop  # optional demonstration
 except ImportError as e:  # pragma: no cover
     print("[ERR] Could not import engine modules – ensure you're running from repository root.")
@@ -76,6 +81,34 @@ def parse_args() -> argparse.Namespace:
         "--criteria",
         help="Comma-separated list of criteria (default: Cost,Reliability,Responsiveness)",
     )
+    p.add_argument(
+        "--solver",
+        choices=SOLVERS,
+        default="mean",
+        help="AHP weight solver (default: mean)",
+    )
+    p.add_argument(
+        "--weight-cache",
+        help="Directory for persisting derived AHP weights between runs",
+    )
+    p.add_argument(
+        "--sensitivity",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Monte Carlo rank-stability check over N sampled weight vectors",
+    )
+    p.add_argument(
+        "--sensitivity-mode",
+        choices=SAMPLING_MODES,
+        default="tnn",
+        help="Sample weights from the TNN indeterminacy or a Dirichlet around the AHP weights",
+    )
+    p.add_argument(
+        "--processes",
+        type=int,
+        help="Worker processes for the sensitivity run (default: in-process)",
+    )
     p.add_argument(
         "--strict",
         action="store_true",
@@ -106,8 +139,12 @@ def main():
     print(f"Loaded matrix shape: {len(matrix)}x{len(matrix[0]) if matrix else 0}")
 
     print("🧮 Deriving criteria weights using Neutrosophic AHP …")
-    weight_engine = CriteriaWeighting(criteria, DEFAULT_TNN)
+    weight_cache = WeightCache(disk_dir=args.weight_cache) if args.weight_cache else None
+    weight_engine = CriteriaWeighting(criteria, DEFAULT_TNN, cache=weight_cache, method=args.solver)
     weights = weight_engine.compute_weights()
+    print(f"Consistency ratio ({args.solver}): {weight_engine.consistency_ratio(weights):.4f}")
+    if weight_cache is not None:
+        print("Weight cache:", weight_cache.stats())
     weights_dict = dict(zip(criteria, [float(w) for w in weights]))
     print("Weights:", {k: round(v, 4) for k, v in weights_dict.items()})
 
@@ -119,6 +156,19 @@ def main():
     for i, (name, score) in enumerate(results, 1):
         print(f"  {i}. {name}  —  Ci = {score:.4f}")
 
+    if args.sensitivity > 0:
+        print(f"🎲 Sensitivity analysis ({args.sensitivity:,} {args.sensitivity_mode} samples) …")
+        analysis = SensitivityAnalysis(criteria, BENEFIT_FLAGS, DEFAULT_TNN, weights=weights, method=args.solver)
+        sensitivity = analysis.run(
+            FORWARDERS, matrix, n_samples=args.sensitivity,
+            mode=args.sensitivity_mode, processes=args.processes,
+        )
+        p_best, stability = sensitivity.p_best(), sensitivity.stability()
+        expected = sensitivity.expected_rank()
+        for name, _ in results:
+            print(f"  {name}: P(best) = {p_best[name]:.3f}, "
+                  f"P(same rank) = {stability[name]:.3f}, E[rank] = {expected[name]:.2f}")
+
     print("🔍 Validating outputs …")
     scores = [float(score) for _, score in results]
     valid_all = validate_all(matrix, weights_dict, scores)
@@ -5,9 +5,20 @@ from datetime import datetime
 import numpy as np
 from scipy import stats
 import json
+import numbers
 from pathlib import Path
 import warnings
 
+from shipment_table import ShipmentTable, parse_numeric
+from anomaly_engine import flag_outliers
+from shipment_validator import ShipmentValidator, ValidationReport
+from date_normalizer import DEFAULT_CACHE as DATE_CACHE, parse_day, to_epoch_days
+from shipment_stream import DEFAULT_CHUNK_SIZE, iter_shipment_chunks
+from stream_aggregators import AnomalyThresholdAggregator, ModeEfficiencyAggregator
+from trend_engine import TrendEngine
+from group_engine import DEFAULT_PERCENTILES, group_efficiency
+from quote_matrix import QuoteMatrix, awarded_quotes, record_quote
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
 
@@ -16,61 +27,57 @@ class DataUtils:
     Core data processing utilities for DeepCAL engine
     Handles data validation, transformation, and metric calculations
     """
+
+    # Grouping keys for anomaly detection: name -> (record fields, table columns)
+    ANOMALY_GROUPS = {
+        'mode': (('mode_of_shipment',), ('mode_of_shipment',)),
+        'lane': (('origin_country', 'destination_country'), ('origin_country', 'destination_country')),
+        'forwarder': (('final_quote_awarded_freight_forwader_Carrier',), ('forwarder',)),
+    }
     
+    # Fields every engine input shipment must carry; types come from shipmentsField.json
+    REQUIRED_FIELDS = (
+        'request_reference',
+        'origin_country',
+        'destination_country',
+        'weight_kg',
+        'date_of_collection',
+        'final_quote_awarded_freight_forwader_Carrier',
+        'mode_of_shipment'
+    )
+
+    _validator: Optional[ShipmentValidator] = None
+
+    @staticmethod
+    def shipment_validator() -> ShipmentValidator:
+        """Schema-backed validator, built once per process"""
+        if DataUtils._validator is None:
+            DataUtils._validator = ShipmentValidator.from_schema(
+                required_fields=DataUtils.REQUIRED_FIELDS,
+                rules={'weight_kg': (lambda col: col.astype(float) > 0, 'weight_kg <= 0')}
+            )
+        return DataUtils._validator
+
+    @staticmethod
+    def validate_shipments_bulk(shipments: List[Dict]) -> ValidationReport:
+        """
+        Validate all shipments column by column
+        Returns a ValidationReport with a validity mask and a (row, field, reason) error table
+        """
+        return DataUtils.shipment_validator().validate(shipments)
+
     @staticmethod
     def validate_shipments(shipments: List[Dict]) -> List[Dict]:
         """
         Validate shipment data against schema requirements
-        Returns only valid shipments with added metadata flags
+        Returns copies of the valid shipments with added metadata flags;
+        use validate_shipments_bulk for the per-row error table
         """
-        required_fields = {
-            'request_reference': str,
-            'origin_country': str,
-            'destination_country': str,
-            'weight_kg': (int, float),
-            'date_of_collection': str,
-            'final_quote_awarded_freight_forwader_Carrier': str,
-            'mode_of_shipment': str
-        }
-        
-        valid_shipments = []
-        
-        for shipment in shipments:
-            try:
-                # Type validation
-                valid = all(
-                    field in shipment and isinstance(shipment[field], type_check)
-                    for field, type_check in required_fields.items()
-                )
-                
-                # Value validation
-                valid &= shipment['weight_kg'] > 0
-                valid &= shipment['date_of_collection'] != ''
-                
-                if valid:
-                    # Add validation metadata
-                    shipment['_validated'] = True
-                    shipment['_validation_errors'] = []
-                    valid_shipments.append(shipment)
-                else:
-                    # Log invalid entries
-                    invalid_reasons = [
-                        f"{field} failed {type_check} check" 
-                        for field, type_check in required_fields.items()
-                        if field not in shipment or not isinstance(shipment[field], type_check)
-                    ]
-                    if shipment['weight_kg'] <= 0:
-                        invalid_reasons.append("weight_kg <= 0")
-                    if shipment['date_of_collection'] == '':
-                        invalid_reasons.append("empty date_of_collection")
-                    
-                    print(f"Invalid shipment {shipment.get('request_reference', '')}: {', '.join(invalid_reasons)}")
-                    
-            except Exception as e:
-                print(f"Validation error for shipment: {str(e)}")
-                continue
-                
-        return valid_shipments
+        report = DataUtils.validate_shipments_bulk(shipments)
+        return [
+            {**shipments[i], '_validated': True, '_validation_errors': []}
+            for i in np.flatnonzero(report.valid)
+        ]
 
     @staticmethod
     def calculate_transit_days(shipment: Dict) -> Optional[float]:
@@ -79,19 +86,35 @@ class DataUtils:
             if not shipment.get('date_of_arrival_destination'):
                 return None
                 
-            collect_date = datetime.strptime(shipment['date_of_collection'], '%Y-%m-%d')
-            arrive_date = datetime.strptime(shipment['date_of_arrival_destination'], '%Y-%m-%d')
+            collect_date = parse_day(shipment['date_of_collection'])
+            arrive_date = parse_day(shipment['date_of_arrival_destination'])
+            if collect_date is None or arrive_date is None:
+                return None
             
             return (arrive_date - collect_date).total_seconds() / (24 * 3600)
-        except:
+        except (KeyError, AttributeError, TypeError):
             return None
 
+    @staticmethod
+    def transit_days_array(shipments: List[Dict]) -> np.ndarray:
+        """
+        Transit days for every shipment as one array subtraction (NaN if unknown)
+        Date columns are format-detected, parsed vectorised and cached by content
+        """
+        collected = DATE_CACHE.epoch_days([s.get('date_of_collection') for s in shipments])
+        arrived = DATE_CACHE.epoch_days([s.get('date_of_arrival_destination') for s in shipments])
+        return arrived - collected
+
     @staticmethod
     def calculate_cost_efficiency(shipment: Dict) -> Optional[float]:
         """Calculate cost per kg/CBM with validation"""
         try:
             forwarder = shipment['final_quote_awarded_freight_forwader_Carrier']
-            cost = shipment['forwarder_quotes'][forwarder.lower()]
+            if 'forwarder_quotes' in shipment:
+                cost = shipment['forwarder_quotes'][forwarder.lower()]
+            else:
+                # Raw exports keep one quote column per forwarder
+                cost = record_quote(shipment, forwarder)
             weight = shipment['weight_kg']
             volume = shipment.get('volume_cbm', 0)
             
@@ -106,88 +129,98 @@ class DataUtils:
             return None
 
     @staticmethod
-    def calculate_historical_trends(shipments: List[Dict], window: str = '30D') -> Dict:
+    def cost_efficiency_array(shipments: List[Dict]) -> np.ndarray:
         """
-        Calculate trends over time using pandas rolling windows
+        calculate_cost_efficiency for every shipment at once (NaN for None)
+        Quote columns are parsed column-wise; records carrying a forwarder_quotes
+        map keep the per-record path
+        """
+        def real(value):
+            # calculate_cost_efficiency compares weight/volume with 0, which only numbers survive
+            return float(value) if isinstance(value, numbers.Real) else np.nan
+
+        awarded = [s.get('final_quote_awarded_freight_forwader_Carrier') for s in shipments]
+        cost = awarded_quotes(shipments, awarded)
+        weight = np.array([real(s.get('weight_kg')) for s in shipments], dtype=np.float64)
+        volume = np.array([real(s.get('volume_cbm', 0)) for s in shipments], dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cost_per_kg = np.where(weight > 0, cost / weight, np.nan)
+            efficiency = np.where(volume > 0, np.minimum(cost_per_kg, cost / volume), cost_per_kg)
+        efficiency[np.isnan(volume)] = np.nan
+        for i, shipment in enumerate(shipments):
+            if 'forwarder_quotes' in shipment:
+                value = DataUtils.calculate_cost_efficiency(shipment)
+                efficiency[i] = np.nan if value is None else value
+        return efficiency
+
+    @staticmethod
+    def calculate_historical_trends(shipments: List[Dict], window: str = '30D',
+                                    group_by: Optional[str] = None) -> Dict:
+        """
+        Calculate trends over time: the latest window vs the window before it
         Returns:
             {
-                'on_time_rate': {'current': 0.85, 'trend': 0.02},
-                'cost_efficiency': {'current': 2.45, 'trend': -0.15},
+                'on_time_rate': {'current': 0.85, 'trend': 0.02, 'percent_change': 2.4},
+                'cost_efficiency': {'current': 2.45, 'trend': -0.15, 'percent_change': -5.8},
                 ...
             }
+        With group_by ('mode' | 'lane' | 'forwarder') the same dict is returned per group label.
+        For repeated polling keep the engine from build_trend_engine and append to it instead.
         """
         try:
-            df = pd.DataFrame(shipments)
-            
-            # Convert dates and calculate metrics
-            df['date'] = pd.to_datetime(df['date_of_collection'])
-            df['transit_days'] = df.apply(DataUtils.calculate_transit_days, axis=1)
-            df['cost_eff'] = df.apply(DataUtils.calculate_cost_efficiency, axis=1)
-            df['on_time'] = df['delivery_status'] == 'Delivered'
-            
-            # Set date index and sort
-            df = df.set_index('date').sort_index()
-            
-            # Calculate rolling metrics
-            results = {}
-            metrics = {
-                'on_time_rate': ('on_time', 'mean'),
-                'avg_transit_days': ('transit_days', 'mean'),
-                'cost_efficiency': ('cost_eff', 'mean')
-            }
-            
-            for name, (col, func) in metrics.items():
-                current = getattr(df[col].last(window), func)()
-                historical = getattr(df[col].rolling(window), func)().iloc[-2]
-                results[name] = {
-                    'current': current,
-                    'trend': current - historical,
-                    'percent_change': ((current - historical) / historical) * 100
-                }
-                
-            return results
+            engine = DataUtils.build_trend_engine(shipments, group_by)
+            return engine.trends_by_group(window) if group_by else engine.trends(window)
         except Exception as e:
             print(f"Trend calculation error: {str(e)}")
             return {}
 
     @staticmethod
-    def detect_anomalies(shipments: List[Dict]) -> Dict:
-        """Identify statistical outliers in cost and transit times"""
-        try:
-            costs = []
-            transit_times = []
-            
-            for s in shipments:
-                cost_eff = DataUtils.calculate_cost_efficiency(s)
-                transit = DataUtils.calculate_transit_days(s)
-                
-                if cost_eff:
-                    costs.append(cost_eff)
-                if transit:
-                    transit_times.append(transit)
-            
-            anomalies = {
-                'high_cost': {
-                    'threshold': np.percentile(costs, 95),
-                    'shipments': [
-                        s['request_reference'] for s in shipments 
-                        if DataUtils.calculate_cost_efficiency(s) and 
-                           DataUtils.calculate_cost_efficiency(s) > np.percentile(costs, 95)
-                    ]
-                },
-                'long_transit': {
-                    'threshold': np.percentile(transit_times, 95),
-                    'shipments': [
-                        s['request_reference'] for s in shipments 
-                        if DataUtils.calculate_transit_days(s) and 
-                           DataUtils.calculate_transit_days(s) > np.percentile(transit_times, 95)
-                    ]
-                }
+    def build_trend_engine(shipments: List[Dict] = (), group_by: Optional[str] = None) -> TrendEngine:
+        """Daily-bucketed TrendEngine over shipments; append later days with append_trends"""
+        return DataUtils.append_trends(TrendEngine(group_by), shipments)
+
+    @staticmethod
+    def append_trends(engine: TrendEngine, shipments: List[Dict]) -> TrendEngine:
+        """Add new shipments to an existing TrendEngine in O(len(shipments))"""
+        if shipments:
+            engine.update(DataUtils.chunk_metrics(shipments))
+        return engine
+
+    @staticmethod
+    def group_labels(shipments: List[Dict], group_by: str) -> np.ndarray:
+        """Per-shipment labels for an ANOMALY_GROUPS key, e.g. 'Kenya -> Zambia' for lane"""
+        fields = DataUtils.ANOMALY_GROUPS[group_by][0]
+        return np.array([' -> '.join(str(s.get(f)) for f in fields) for s in shipments], dtype=object)
+
+    @staticmethod
+    def detect_anomalies(shipments: List[Dict], method: str = 'percentile',
+                         group_by: Optional[str] = None, **params) -> Dict:
+        """
+        Identify statistical outliers in cost and transit times
+        Metrics are computed once per shipment and flagged with boolean masks.
+        method: 'percentile' | 'zscore' | 'mad'; group_by: None | 'mode' | 'lane' | 'forwarder'
+        """
+        refs = np.array([s.get('request_reference') for s in shipments], dtype=object)
+        metrics = {
+            'high_cost': DataUtils.cost_efficiency_array(shipments),
+            'long_transit': DataUtils.transit_days_array(shipments),
+        }
+        groups = DataUtils.group_labels(shipments, group_by).tolist() if group_by else None
+        return DataUtils._anomaly_report(refs, metrics, groups, method, **params)
+
+    @staticmethod
+    def _anomaly_report(refs: np.ndarray, metrics: Dict[str, np.ndarray], groups,
+                        method: str, **params) -> Dict:
+        anomalies = {}
+        for name, values in metrics.items():
+            mask, thresholds = flag_outliers(values, groups=groups, method=method, **params)
+            if not thresholds:
+                return {}
+            anomalies[name] = {
+                'threshold': thresholds if groups is not None else thresholds[None],
+                'shipments': refs[mask].tolist()
             }
-            
-            return anomalies
-        except:
-            return {}
+        return anomalies
 
     @staticmethod
     def load_reference_data() -> Dict:
@@ -208,46 +241,177 @@ class DataUtils:
     @staticmethod
     def calculate_mode_efficiency(shipments: List[Dict]) -> Dict:
         """Compare performance across shipping modes"""
-        modes = {}
-        
-        for s in shipments:
-            mode = s['mode_of_shipment']
-            if mode not in modes:
-                modes[mode] = {
-                    'count': 0,
-                    'total_cost': 0,
-                    'total_weight': 0,
-                    'transit_times': [],
-                    'on_time_count': 0
-                }
-                
-            modes[mode]['count'] += 1
-            cost_eff = DataUtils.calculate_cost_efficiency(s)
-            if cost_eff:
-                modes[mode]['total_cost'] += cost_eff * s['weight_kg']
-                modes[mode]['total_weight'] += s['weight_kg']
-                
-            transit = DataUtils.calculate_transit_days(s)
-            if transit:
-                modes[mode]['transit_times'].append(transit)
-                
-            if s.get('delivery_status') == 'Delivered':
-                modes[mode]['on_time_count'] += 1
-                
-        # Calculate aggregates
-        results = {}
-        for mode, stats in modes.items():
-            results[mode] = {
-                'shipment_count': stats['count'],
-                'avg_cost_per_kg': stats['total_cost'] / stats['total_weight'] if stats['total_weight'] > 0 else 0,
-                'avg_transit_days': np.mean(stats['transit_times']) if stats['transit_times'] else 0,
-                'on_time_rate': stats['on_time_count'] / stats['count'] if stats['count'] > 0 else 0,
-                'cost_std_dev': np.std([DataUtils.calculate_cost_efficiency(s) 
-                                      for s in shipments 
-                                      if s['mode_of_shipment'] == mode and DataUtils.calculate_cost_efficiency(s)])
+        return DataUtils.calculate_group_efficiency(shipments, by='mode')
+
+    @staticmethod
+    def calculate_group_efficiency(shipments: List[Dict], by='mode',
+                                   percentiles=DEFAULT_PERCENTILES) -> Dict:
+        """
+        Count, weighted cost/kg, transit mean/std/percentiles and on-time rate per group
+        by: any of 'mode', 'lane', 'forwarder', 'category', 'month', or a tuple of them
+        """
+        if not shipments:
+            return {}
+        return group_efficiency(DataUtils.chunk_metrics(shipments), by, percentiles)
+
+    # --- Columnar equivalents operating on a ShipmentTable -----------------
+
+    @staticmethod
+    def load_shipment_table(path) -> ShipmentTable:
+        """Parse a shipments JSON export once into typed columns"""
+        return ShipmentTable.from_json(path)
+
+    @staticmethod
+    def load_quote_matrix(path, cache_dir=None) -> QuoteMatrix:
+        """Shipment x forwarder quote matrix, cached in cache_dir until the export changes"""
+        return QuoteMatrix.from_json(path, cache_dir=cache_dir)
+
+    @staticmethod
+    def validate_table(table: ShipmentTable) -> np.ndarray:
+        """Boolean mask of rows passing the validate_shipments checks"""
+        frame = table.frame
+        valid = frame['request_reference'].notna().to_numpy().copy()
+        for column in ('origin_country', 'destination_country', 'forwarder', 'mode_of_shipment'):
+            valid &= table.codes(column) >= 0
+        valid &= table['weight_kg'] > 0
+        valid &= ~np.isnat(table['date_of_collection'])
+        return valid
+
+    @staticmethod
+    def transit_days_table(table: ShipmentTable) -> np.ndarray:
+        """Transit days per row, NaN where either date is missing"""
+        delta = table['date_of_arrival_destination'] - table['date_of_collection']
+        return delta / np.timedelta64(1, 'D')
+
+    @staticmethod
+    def cost_efficiency_table(table: ShipmentTable) -> np.ndarray:
+        """min(cost per kg, cost per CBM) per row, NaN where it cannot be computed"""
+        cost = table['cost'].astype(np.float64)
+        weight = table['weight_kg'].astype(np.float64)
+        volume = table['volume_cbm'].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_kg = np.where(weight > 0, cost / weight, np.nan)
+            per_cbm = np.where(volume > 0, cost / volume, np.inf)
+        return np.where(np.isnan(per_kg), np.nan, np.minimum(per_kg, per_cbm))
+
+    @staticmethod
+    def detect_anomalies_table(table: ShipmentTable, method: str = 'percentile',
+                               group_by: Optional[str] = None, **params) -> Dict:
+        """Columnar detect_anomalies, same methods and grouping options"""
+        refs = np.asarray(table['request_reference'], dtype=object)
+        metrics = {
+            'high_cost': DataUtils.cost_efficiency_table(table),
+            'long_transit': DataUtils.transit_days_table(table),
+        }
+        groups = None
+        if group_by:
+            columns = DataUtils.ANOMALY_GROUPS[group_by][1]
+            labels = [table.labels(c).astype(str) for c in columns]
+            groups = labels[0] if len(labels) == 1 else np.char.add(np.char.add(labels[0], ' -> '), labels[1])
+        return DataUtils._anomaly_report(refs, metrics, groups, method, **params)
+
+    @staticmethod
+    def calculate_mode_efficiency_table(table: ShipmentTable) -> Dict:
+        """Columnar calculate_mode_efficiency grouped on category codes"""
+        return DataUtils.calculate_group_efficiency_table(table, by='mode')
+
+    @staticmethod
+    def calculate_group_efficiency_table(table: ShipmentTable, by='mode',
+                                         percentiles=DEFAULT_PERCENTILES) -> Dict:
+        """Columnar calculate_group_efficiency"""
+        if not len(table):
+            return {}
+        return group_efficiency(DataUtils.table_metrics(table), by, percentiles)
+
+    @staticmethod
+    def table_metrics(table: ShipmentTable) -> Dict[str, np.ndarray]:
+        """chunk_metrics equivalent for a ShipmentTable"""
+        origin = table.labels('origin_country').astype(str)
+        destination = table.labels('destination_country').astype(str)
+        return {
+            'mode': table.labels('mode_of_shipment'),
+            'lane': np.char.add(np.char.add(origin, ' -> '), destination),
+            'forwarder': table.labels('forwarder'),
+            'category': table.labels('item_category'),
+            'day': to_epoch_days(table['date_of_collection']),
+            'weight': table['weight_kg'].astype(np.float64),
+            'cost_eff': DataUtils.cost_efficiency_table(table),
+            'transit': DataUtils.transit_days_table(table),
+            'on_time': table.labels('delivery_status') == 'Delivered',
+        }
+
+    # --- Streaming (bounded memory) ------------------------------------------
+
+    @staticmethod
+    def chunk_metrics(shipments: List[Dict]) -> Dict[str, np.ndarray]:
+        """Per-shipment metric arrays for one chunk, fed to the stream aggregators"""
+        # Same content-keyed cache as transit_days_array: a chunk already seen by
+        # detect_anomalies (or a repeated pass) is not parsed again
+        collected = DATE_CACHE.epoch_days([s.get('date_of_collection') for s in shipments])
+        arrived = DATE_CACHE.epoch_days([s.get('date_of_arrival_destination') for s in shipments])
+        cost_eff = DataUtils.cost_efficiency_array(shipments)
+        transit = arrived - collected
+        return {
+            'request_reference': np.array([s.get('request_reference') for s in shipments], dtype=object),
+            'mode': DataUtils.group_labels(shipments, 'mode'),
+            'lane': DataUtils.group_labels(shipments, 'lane'),
+            'forwarder': DataUtils.group_labels(shipments, 'forwarder'),
+            'category': np.array([s.get('item_category') for s in shipments], dtype=object),
+            'weight': parse_numeric([s.get('weight_kg') for s in shipments], dtype=np.float64),
+            'day': collected,
+            'cost_eff': cost_eff,
+            'transit': transit,
+            'transit_days': transit,
+            'on_time': np.array([s.get('delivery_status') == 'Delivered' for s in shipments], dtype=bool),
+            'high_cost': cost_eff,
+            'long_transit': transit,
+        }
+
+    @staticmethod
+    def stream_engine_metrics(path, chunk_size: int = DEFAULT_CHUNK_SIZE, window_days: int = 30,
+                              percentile: float = 95.0, **reader_kwargs) -> Dict:
+        """
+        prepare_engine_input metrics for a shipment file too large to load at once
+        Reads JSON array / JSON Lines / Parquet in chunks: one pass feeds the
+        mergeable aggregators, a second collects shipments above the t-digest thresholds.
+        """
+        modes = ModeEfficiencyAggregator()
+        trends = TrendEngine()
+        thresholds = AnomalyThresholdAggregator()
+        shipment_count = 0
+
+        for chunk in iter_shipment_chunks(path, chunk_size=chunk_size, **reader_kwargs):
+            valid = DataUtils.validate_shipments(chunk)
+            if not valid:
+                continue
+            shipment_count += len(valid)
+            metrics = DataUtils.chunk_metrics(valid)
+            modes.update(metrics)
+            trends.update(metrics)
+            thresholds.update(metrics)
+
+        anomalies = {}
+        limits = thresholds.thresholds(percentile)
+        if limits:
+            anomalies = {name: {'threshold': limit, 'shipments': []} for name, limit in limits.items()}
+            for chunk in iter_shipment_chunks(path, chunk_size=chunk_size, **reader_kwargs):
+                valid = DataUtils.validate_shipments(chunk)
+                if not valid:
+                    continue
+                metrics = DataUtils.chunk_metrics(valid)
+                for name, limit in limits.items():
+                    with np.errstate(invalid='ignore'):
+                        flagged = metrics[name] > limit
+                    anomalies[name]['shipments'].extend(metrics['request_reference'][flagged].tolist())
+
+        return {
+            'shipment_count': shipment_count,
+            'metrics': {
+                'historical_trends': trends.trends(window_days),
+                'anomalies': anomalies,
+                'mode_efficiency': modes.result()
             }
-            
-        return results
+        }
 
     @staticmethod
     def prepare_engine_input(shipments: List[Dict]) -> Dict:
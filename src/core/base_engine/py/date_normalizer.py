@@ -0,0 +1,130 @@
+# CORE/base_engine/py/date_normalizer.py
+from typing import Iterable, Optional, Union
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Formats seen in shipment exports, most common first
+CANDIDATE_FORMATS = (
+    '%Y-%m-%d',     # public/shipments.json
+    '%d-%b-%y',     # deeptrack_3.json: 11-Jan-24
+    '%d-%b-%Y',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+    '%Y/%m/%d',
+    '%d %b %Y',
+    '%Y-%m-%dT%H:%M:%S',
+)
+
+FORMAT_SAMPLE_SIZE = 64
+
+
+def _clean(series: pd.Series) -> pd.Series:
+    """Strip whitespace, blank -> missing, and fix the 'Sept' month abbreviation"""
+    text = series.astype('string').str.strip()
+    text = text.str.replace('Sept', 'Sep', regex=False)
+    return text.mask(text == '')
+
+
+def detect_format(values: Union[pd.Series, Iterable], sample_size: int = FORMAT_SAMPLE_SIZE) -> Optional[str]:
+    """Pick the candidate format parsing the most of a sample of the column"""
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    sample = _clean(series).dropna()
+    sample = sample.iloc[:sample_size]
+    if sample.empty:
+        return None
+    best, best_count = None, 0
+    for fmt in CANDIDATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best
+
+
+def parse_date_column(values: Union[pd.Series, Iterable]) -> np.ndarray:
+    """
+    Parse a whole date column into datetime64[D]
+
+    The format is detected once from a sample and applied vectorised; only
+    rows it cannot parse fall back to per-value inference. Unparseable
+    entries become NaT.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.infer_dtype(series, skipna=True) in ('datetime64', 'datetime', 'date'):
+        # Already typed (e.g. Parquet timestamp columns): no parsing needed
+        series = pd.to_datetime(series, errors='coerce', utc=True).dt.tz_localize(None)
+        return series.to_numpy(dtype='datetime64[D]')
+    text = _clean(series.reset_index(drop=True))
+    fmt = detect_format(text)
+    if fmt is None:
+        return np.full(len(text), np.datetime64('NaT'), dtype='datetime64[D]')
+    parsed = pd.to_datetime(text, format=fmt, errors='coerce')
+    leftover = parsed.isna() & text.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(text[leftover], format='mixed', errors='coerce')
+    return parsed.to_numpy(dtype='datetime64[D]')
+
+
+def to_epoch_days(dates: np.ndarray) -> np.ndarray:
+    """datetime64 -> float days since 1970-01-01, NaN for NaT"""
+    days = dates.astype('datetime64[D]')
+    out = days.astype(np.int64).astype(np.float64)
+    out[np.isnat(days)] = np.nan
+    return out
+
+
+@lru_cache(maxsize=4096)
+def parse_day(text: str) -> Optional[datetime]:
+    """Parse one date string in any candidate format (memoised per distinct string)"""
+    text = text.strip().replace('Sept', 'Sep')
+    for fmt in CANDIDATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class EpochDayCache:
+    """
+    Bounded LRU of parsed epoch-day arrays keyed on column content
+
+    Repeated passes over the same shipment list (trends, mode efficiency,
+    anomalies) hash the raw column instead of re-parsing it.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def epoch_days(self, values: Iterable) -> np.ndarray:
+        series = pd.Series(values if isinstance(values, list) else list(values), dtype=object)
+        key = self._key(series)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        days = to_epoch_days(parse_date_column(series))
+        days.setflags(write=False)
+        self._entries[key] = days
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return days
+
+    @staticmethod
+    def _key(series: pd.Series) -> str:
+        hashed = pd.util.hash_pandas_object(series.astype('string'), index=False).to_numpy()
+        return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+DEFAULT_CACHE = EpochDayCache()
@@ -0,0 +1,198 @@
+# deepcal_engine/engine_service.py
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FileWatcher:
+    """
+    mtime/size polling watcher with debounce.
+
+    changed() is cheap (one stat per path); a change is only reported once
+    the files have stopped moving for `debounce` seconds, so an editor or
+    exporter writing in several steps triggers a single re-rank.
+    """
+
+    def __init__(self, paths, debounce=0.5):
+        self.paths = [os.fspath(p) for p in paths]
+        self.debounce = debounce
+        self._seen = self._snapshot()
+        self._pending = None
+        self._pending_since = 0.0
+
+    def _snapshot(self):
+        snapshot = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    @property
+    def settling(self):
+        """A change was seen and is waiting out the debounce window."""
+        return self._pending is not None
+
+    def changed(self):
+        current = self._snapshot()
+        now = time.monotonic()
+        if current != (self._pending or self._seen):
+            self._pending, self._pending_since = current, now
+            return False
+        if self._pending is not None and now - self._pending_since >= self.debounce:
+            self._seen, self._pending = self._pending, None
+            return True
+        return False
+
+
+class EngineService:
+    """
+    Long-running engine: re-ranks only when watched inputs change.
+
+    `compute` is called once at start and again after each debounced change.
+    Its JSON-serialisable result is encoded once and kept as bytes, so
+    endpoint reads are a lock-free reference read. The compute callable
+    keeps its own state (weight cache, quote matrices) warm between runs.
+    """
+
+    def __init__(self, compute, watch_paths, poll_interval=1.0, debounce=0.5, on_result=None):
+        self.compute = compute
+        self.watcher = FileWatcher(watch_paths, debounce=debounce)
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.generation = 0
+        self.last_updated = None
+        self.last_error = None
+        self._payload = b"null"
+        self._stop = threading.Event()
+        self._servers = []
+
+    # --- Recompute loop ------------------------------------------------------
+
+    def refresh(self):
+        started = time.perf_counter()
+        try:
+            result = self.compute()
+            if result is None:
+                raise ValueError("compute returned no result")
+        except Exception as e:  # keep serving the last good rankings
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[service] Re-rank failed, keeping previous result: {self.last_error}")
+            return False
+        self.generation += 1
+        self.last_updated = datetime.utcnow().isoformat()
+        self.last_error = None
+        self._payload = json.dumps(
+            {"generation": self.generation, "updated": self.last_updated, "result": result},
+            default=_json_default,
+        ).encode("utf-8")
+        print(f"[service] Re-ranked (generation {self.generation}) in {time.perf_counter() - started:.3f}s")
+        if self.on_result is not None:
+            self.on_result(result)
+        return True
+
+    def run(self):
+        """Block until stop(); the watcher wakes every poll_interval seconds."""
+        self.refresh()
+        # Sleep the debounce window instead of the full interval while a change settles
+        while not self._stop.wait(self.watcher.debounce if self.watcher.settling else self.poll_interval):
+            if self.watcher.changed():
+                self.refresh()
+
+    def stop(self):
+        self._stop.set()
+        servers, self._servers = self._servers, []
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server.server_address, str) and os.path.exists(server.server_address):
+                os.unlink(server.server_address)
+
+    # --- Endpoint ------------------------------------------------------------
+
+    @property
+    def payload(self):
+        return self._payload
+
+    def health(self):
+        return {
+            "generation": self.generation,
+            "updated": self.last_updated,
+            "error": self.last_error,
+            "watching": self.watcher.paths,
+        }
+
+    def serve_http(self, host="127.0.0.1", port=8765):
+        """Expose GET /rankings and GET /health on a local TCP port (served from a thread)."""
+        return self._serve(ThreadingHTTPServer((host, port), _handler_for(self)))
+
+    def serve_unix(self, path):
+        """Same endpoint over a Unix domain socket."""
+        if os.path.exists(path):
+            os.unlink(path)
+        return self._serve(_UnixHTTPServer(path, _handler_for(self)))
+
+    def _serve(self, server):
+        threading.Thread(target=server.serve_forever, name="deepcal-endpoint", daemon=True).start()
+        self._servers.append(server)
+        return server
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _handler_for(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path in ("", "/rankings"):
+                self._send(200, service.payload)
+            elif path == "/health":
+                self._send(200, json.dumps(service.health()).encode("utf-8"))
+            else:
+                self._send(404, b'{"error": "not found"}')
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            # Unix-socket peers have no (host, port)
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _json_default(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def unix_request(path, url="/rankings"):
+    """Minimal GET over a Unix socket, for health checks and tests."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(f"GET {url} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode("ascii"))
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    _, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+    return json.loads(body)
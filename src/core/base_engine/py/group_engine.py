@@ -0,0 +1,92 @@
+# CORE/base_engine/py/group_engine.py
+from typing import Dict, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# Grouping keys understood by group_efficiency; 'month' is derived from the collection day
+GROUP_KEYS = ('mode', 'lane', 'forwarder', 'category', 'month')
+DEFAULT_PERCENTILES = (50, 90, 95)
+KEY_SEPARATOR = ' | '
+
+
+def month_labels(days: np.ndarray) -> np.ndarray:
+    """Epoch days -> 'YYYY-MM' labels, 'None' where the day is unknown"""
+    days = np.asarray(days, dtype=np.float64)
+    months = np.full(days.shape, 'None', dtype=object)
+    known = ~np.isnan(days)
+    stamps = days[known].astype('datetime64[D]').astype('datetime64[M]')
+    months[known] = np.datetime_as_string(stamps, unit='M')
+    return months
+
+
+def _labels(metrics: Dict[str, np.ndarray], key: str) -> np.ndarray:
+    if key not in GROUP_KEYS:
+        raise ValueError(f"Unknown group key {key!r}; expected one of {GROUP_KEYS}")
+    if key == 'month':
+        return month_labels(metrics['day'])
+    return np.asarray(metrics[key], dtype=object).astype(str)
+
+
+def group_efficiency(metrics: Dict[str, np.ndarray], by: Union[str, Sequence[str]] = 'mode',
+                     percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict]:
+    """
+    Efficiency breakdown for any key set in one vectorised group-by pass
+
+    metrics: equal-length arrays 'cost_eff', 'weight', 'transit', 'on_time'
+    (and 'day' for month), plus label arrays for the keys in `by`.
+    Multi-key groups are labelled 'Kenya -> Zambia | Air'.
+
+    Cost and transit follow calculate_mode_efficiency: rows with a missing
+    or zero value are left out of those metrics but still counted.
+    """
+    keys = (by,) if isinstance(by, str) else tuple(by)
+    cost_eff = np.asarray(metrics['cost_eff'], dtype=np.float64)
+    weight = np.asarray(metrics['weight'], dtype=np.float64)
+    transit = np.asarray(metrics['transit'], dtype=np.float64)
+    has_cost = ~np.isnan(cost_eff) & (cost_eff != 0)
+    has_transit = ~np.isnan(transit) & (transit != 0)
+
+    labels = _labels(metrics, keys[0])
+    for key in keys[1:]:
+        labels = labels + KEY_SEPARATOR + _labels(metrics, key)
+    frame = pd.DataFrame({
+        'group': pd.Categorical(labels),
+        'weighted_cost': np.where(has_cost, cost_eff * weight, 0.0),
+        'cost_weight': np.where(has_cost, weight, 0.0),
+        'cost_eff': np.where(has_cost, cost_eff, np.nan),
+        'transit': np.where(has_transit, transit, np.nan),
+        'on_time': np.asarray(metrics['on_time'], dtype=bool),
+    })
+    grouped = frame.groupby('group', observed=True)
+    agg = grouped.agg(
+        count=('on_time', 'size'),
+        weighted_cost=('weighted_cost', 'sum'),
+        cost_weight=('cost_weight', 'sum'),
+        transit_mean=('transit', 'mean'),
+        on_time=('on_time', 'sum'),
+    )
+    spread = grouped[['cost_eff', 'transit']].std(ddof=0)
+    quantiles = [p / 100.0 for p in percentiles]
+    transit_pct = (grouped['transit'].quantile(quantiles).unstack()
+                   if quantiles else pd.DataFrame(index=agg.index))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_cost = np.where(agg['cost_weight'] > 0, agg['weighted_cost'] / agg['cost_weight'], 0.0)
+    avg_transit = agg['transit_mean'].fillna(0.0).to_numpy()
+    on_time_rate = (agg['on_time'] / agg['count']).to_numpy()
+
+    results = {}
+    for i, group in enumerate(agg.index):
+        results[group] = {
+            'shipment_count': int(agg['count'].iat[i]),
+            'avg_cost_per_kg': float(avg_cost[i]),
+            'avg_transit_days': float(avg_transit[i]),
+            'transit_std_dev': float(spread['transit'].iat[i]),
+            'transit_percentiles': {
+                f"p{p:g}": float(transit_pct.loc[group, q]) for p, q in zip(percentiles, quantiles)
+            },
+            'on_time_rate': float(on_time_rate[i]),
+            'cost_std_dev': float(spread['cost_eff'].iat[i]),
+        }
+    return results
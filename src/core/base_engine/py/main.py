@@ -2,10 +2,14 @@
 from deepcal_engine.weighting import CriteriaWeighting
 from deepcal_engine.ranking import AlternativeRanking
 from deepcal_engine.feedback import FeedbackLoop
+from deepcal_engine.weight_cache import WeightCache
+from deepcal_engine.engine_service import EngineService
 from deepcal_engine.utils import load_decision_matrix, validate_input, log_decision, explain_to_human
 
-import time
+import argparse
+import signal
 from datetime import datetime
+from pathlib import Path
 
 # Constants
 CRITERIA = ["Cost", "Reliability", "Responsiveness"]
@@ -18,16 +22,27 @@ TNN_JUDGMENTS = {
 
 FORWARDERS = ["A", "B", "C", "D"]
 
+# Judgments rarely change between runs, so weights are reused across iterations
+WEIGHT_CACHE = WeightCache()
 
-def run_deepcal_simulation():
+# Inputs the service watches; a change triggers a re-rank
+DECISION_MATRIX_PATH = "data/decision_matrix.csv"
+ENGINE_DIR = Path(__file__).resolve().parent
+SHIPMENT_SOURCES = [
+    ENGINE_DIR.parents[1] / "base_data" / "deeptrack_3.json",
+    ENGINE_DIR.parents[3] / "public" / "shipments.json",
+]
+
+
+def run_deepcal_simulation(matrix_path=DECISION_MATRIX_PATH):
     # Load and validate decision matrix
-    decision_matrix = load_decision_matrix()
+    decision_matrix = load_decision_matrix(matrix_path)
     if not validate_input(decision_matrix):
-        print("Invalid input data. Aborting.")
-        return
+        # Raise rather than return None so the service keeps the last good rankings
+        raise ValueError(f"Invalid input data in {matrix_path}")
 
     # Step 1: Weight Derivation
-    weight_engine = CriteriaWeighting(CRITERIA, TNN_JUDGMENTS)
+    weight_engine = CriteriaWeighting(CRITERIA, TNN_JUDGMENTS, cache=WEIGHT_CACHE)
     weights = weight_engine.compute_weights()
 
     # Step 2: TOPSIS Ranking
@@ -53,11 +68,52 @@ def run_deepcal_simulation():
     explanation = explain_to_human(CRITERIA, weights, results)
     print(explanation)
 
+    return {
+        "timestamp": timestamp,
+        "weights": dict(zip(CRITERIA, [float(w) for w in weights])),
+        "rankings": [{"forwarder": name, "score": float(score)} for name, score in results],
+        "explanation": explanation,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DeepCAL engine")
+    parser.add_argument("--matrix", default=DECISION_MATRIX_PATH, help="Decision matrix CSV to rank and watch")
+    parser.add_argument("--shipments", action="append", type=Path,
+                        help="Shipment source to watch (repeatable); defaults to deeptrack_3.json and public/shipments.json")
+    parser.add_argument("--once", action="store_true", help="Rank once and exit instead of running as a service")
+    parser.add_argument("--port", type=int, help="Serve the latest rankings on http://127.0.0.1:PORT/rankings")
+    parser.add_argument("--unix-socket", help="Serve the latest rankings on this Unix domain socket")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between input checks")
+    parser.add_argument("--debounce", type=float, default=0.5, help="Seconds inputs must be stable before re-ranking")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    try:
-        while True:
-            run_deepcal_simulation()
-            time.sleep(20)
-    except KeyboardInterrupt:
-        print("\nSimulation manually stopped.")
+    args = parse_args()
+    if args.once:
+        try:
+            run_deepcal_simulation(args.matrix)
+        except ValueError as e:
+            print(f"{e}. Aborting.")
+    else:
+        # Re-rank only when the inputs change instead of every 20 seconds
+        service = EngineService(
+            lambda: run_deepcal_simulation(args.matrix),
+            watch_paths=[args.matrix, *(args.shipments or SHIPMENT_SOURCES)],
+            poll_interval=args.poll_interval,
+            debounce=args.debounce,
+        )
+        if args.port:
+            service.serve_http(port=args.port)
+            print(f"Serving rankings on http://127.0.0.1:{args.port}/rankings")
+        if args.unix_socket:
+            service.serve_unix(args.unix_socket)
+            print(f"Serving rankings on unix:{args.unix_socket}")
+        signal.signal(signal.SIGTERM, lambda *_: service.stop())
+        try:
+            service.run()
+        except KeyboardInterrupt:
+            print("\nSimulation manually stopped.")
+        finally:
+            service.stop()
@@ -0,0 +1,314 @@
+# CORE/base_engine/py/quote_matrix.py
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from shipment_table import parse_numeric
+
+# Canonical forwarder -> quote column in each export
+# (public/shipments.json, base_data/deeptrack_3.json)
+FORWARDER_COLUMNS = {
+    'Kuehne Nagel': ('kuehne_nagel',),
+    'DHL Express': ('dhl', 'dhl_express'),
+    'DHL Global': ('dhl_global',),
+    'Scan Global': ('scan_global', 'scan_global_logistics'),
+    'Siginon': ('siginon_global', 'siginon'),
+    'AGL': ('agl',),
+    'Bwosi': ('bwosi',),
+    'Freight In Time': ('freight_in_time', 'frieght_in_time'),
+}
+FORWARDERS = tuple(FORWARDER_COLUMNS)
+
+# Awarded-forwarder spellings seen in the exports, normalised (see _name_key)
+FORWARDER_ALIASES = {
+    'kuehnenagel': 'Kuehne Nagel',
+    'kuehneandnagel': 'Kuehne Nagel',
+    'dhlexpress': 'DHL Express',
+    'dhl': 'DHL Express',
+    'dhlglobal': 'DHL Global',
+    'scanglobal': 'Scan Global',
+    'scangloballogistics': 'Scan Global',
+    'siginon': 'Siginon',
+    'siginonlogistics': 'Siginon',
+    'siginonlimited': 'Siginon',
+    'siginonglobal': 'Siginon',
+    'agl': 'AGL',
+    'bwosi': 'Bwosi',
+    'freightintime': 'Freight In Time',
+    'frieghtintime': 'Freight In Time',
+}
+
+# Per-lane alternatives handed to AlternativeRanking
+QUOTE_CRITERIA = ('avg_quote', 'quote_rate')
+QUOTE_BENEFIT = {'avg_quote': False, 'quote_rate': True}
+
+CACHE_VERSION = 1
+
+_NON_NUMERIC = re.compile(r'[^0-9.\-]')
+
+
+def _name_key(name) -> str:
+    return re.sub(r'[^a-z]', '', str(name).lower())
+
+
+def canonical_forwarder(name) -> Optional[str]:
+    """'Kuehne and Nagel' / 'DHl Express' -> canonical FORWARDERS entry, None if unknown"""
+    return FORWARDER_ALIASES.get(_name_key(name))
+
+
+def parse_quotes(values, dtype=np.float32) -> np.ndarray:
+    """'$18,681.00' / '59,500' / 'No Quote' / '0' -> float32 (or `dtype`) with NaN for no quote"""
+    quotes = parse_numeric(values, dtype=dtype)
+    quotes[~(quotes > 0)] = np.nan
+    return quotes
+
+
+def parse_quote(value) -> Optional[float]:
+    """Scalar parse_quotes for one cell; None for no quote"""
+    try:
+        quote = float(value)
+    except (TypeError, ValueError):
+        if not isinstance(value, str):
+            return None
+        try:
+            quote = float(_NON_NUMERIC.sub('', value))
+        except ValueError:
+            return None
+    return quote if quote > 0 else None
+
+
+def _quote_column(shipment: Dict, canonical: str) -> Optional[str]:
+    return next((column for column in FORWARDER_COLUMNS[canonical] if column in shipment), None)
+
+
+def record_quote(shipment: Dict, forwarder) -> Optional[float]:
+    """Quote a single raw record holds for a forwarder (awarded-name spellings accepted)"""
+    canonical = canonical_forwarder(forwarder)
+    column = _quote_column(shipment, canonical) if canonical is not None else None
+    return None if column is None else parse_quote(shipment[column])
+
+
+def awarded_quotes(records: List[Dict], awarded: Sequence) -> np.ndarray:
+    """
+    record_quote for every record at once (float64, NaN for no quote)
+
+    Records are grouped by the quote column their awarded forwarder reads,
+    and each group is parsed as one column.
+    """
+    canonical = {name: canonical_forwarder(name) for name in set(map(str, awarded))}
+    rows_by_column: Dict[str, List[int]] = {}
+    for i, (record, name) in enumerate(zip(records, awarded)):
+        forwarder = canonical[str(name)]
+        column = _quote_column(record, forwarder) if forwarder is not None else None
+        if column is not None:
+            rows_by_column.setdefault(column, []).append(i)
+    quotes = np.full(len(records), np.nan)
+    for column, rows in rows_by_column.items():
+        quotes[rows] = parse_quotes([records[i][column] for i in rows], dtype=np.float64)
+    return quotes
+
+
+class QuoteMatrix:
+    """
+    Dense shipment x forwarder quote matrix parsed once from raw records
+
+    quotes:  float32 (n_shipments, n_forwarders), NaN where no quote was given
+    quoted:  bool mask of the same shape
+    weight_kg / volume_cbm: float32 per shipment
+    Lane slices index rows by origin/destination without touching the strings again.
+    """
+
+    ARRAYS = ('references', 'origin', 'destination', 'mode', 'awarded', 'quotes', 'weight_kg', 'volume_cbm')
+
+    def __init__(self, references: np.ndarray, origin: np.ndarray, destination: np.ndarray,
+                 mode: np.ndarray, awarded: np.ndarray, quotes: np.ndarray,
+                 weight_kg: np.ndarray, volume_cbm: np.ndarray, forwarders: Sequence[str] = FORWARDERS):
+        self.references = references
+        self.origin = origin
+        self.destination = destination
+        self.mode = mode
+        self.awarded = awarded
+        self.quotes = quotes
+        self.quoted = ~np.isnan(quotes)
+        self.weight_kg = weight_kg
+        self.volume_cbm = volume_cbm
+        self.forwarders = tuple(forwarders)
+        self._lanes: Optional[Dict[Tuple[str, str], np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.quotes)
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'QuoteMatrix':
+        raw = pd.DataFrame.from_records(records)
+
+        def column(*names) -> pd.Series:
+            for name in names:
+                if name in raw:
+                    return raw[name]
+            return pd.Series([None] * len(raw), dtype=object)
+
+        def labels(*names) -> np.ndarray:
+            return column(*names).fillna('').astype(str).str.strip().to_numpy(dtype=str)
+
+        quotes = np.column_stack(
+            [parse_quotes(column(*FORWARDER_COLUMNS[f])) for f in FORWARDERS]
+        ) if len(raw) else np.empty((0, len(FORWARDERS)), dtype=np.float32)
+        return cls(
+            references=labels('request_reference'),
+            origin=labels('origin_country'),
+            destination=labels('destination_country'),
+            mode=labels('mode_of_shipment'),
+            awarded=labels('final_quote_awarded_freight_forwader_Carrier', 'final_quote_awarded'),
+            quotes=quotes.astype(np.float32),
+            weight_kg=parse_numeric(column('weight_kg')),
+            volume_cbm=parse_numeric(column('volume_cbm')),
+        )
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None) -> 'QuoteMatrix':
+        """
+        Parse a shipments JSON export, reusing an .npz cache in cache_dir when the source is unchanged
+
+        The cache is keyed on the source's mtime and size; when those moved but the
+        content hash still matches (e.g. a checkout touched the file) it is reused too.
+        """
+        path = Path(path)
+        if cache_dir is None:
+            with open(path, 'r') as f:
+                return cls.from_records(json.load(f))
+        cache_path = cls._cache_path(path, Path(cache_dir))
+        stat = path.stat()
+        meta = cls._read_meta(cache_path)
+        if meta is not None:
+            if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+                return cls.load(cache_path)
+            if meta['sha256'] == _file_digest(path):
+                cached = cls.load(cache_path)
+                cached.save(cache_path, path)
+                return cached
+        with open(path, 'r') as f:
+            matrix = cls.from_records(json.load(f))
+        matrix.save(cache_path, path)
+        return matrix
+
+    # --- Disk cache ----------------------------------------------------------
+
+    def save(self, cache_path: Union[str, Path], source: Optional[Path] = None):
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {'version': CACHE_VERSION, 'forwarders': list(self.forwarders)}
+        if source is not None:
+            stat = source.stat()
+            meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=_file_digest(source))
+        tmp = cache_path.with_name(cache_path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp, cache_path)
+
+    @classmethod
+    def load(cls, cache_path: Union[str, Path]) -> 'QuoteMatrix':
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(**{name: data[name] for name in cls.ARRAYS}, forwarders=meta['forwarders'])
+
+    @staticmethod
+    def _cache_path(source: Path, cache_dir: Path) -> Path:
+        tag = hashlib.sha1(str(source.resolve()).encode('utf-8')).hexdigest()[:12]
+        return cache_dir / f"{source.stem}-{tag}.quotes.npz"
+
+    @staticmethod
+    def _read_meta(cache_path: Path) -> Optional[Dict]:
+        if not cache_path.exists():
+            return None
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get('version') != CACHE_VERSION or 'sha256' not in meta:
+            return None
+        return meta
+
+    # --- Lane slices ---------------------------------------------------------
+
+    def lanes(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """(origin, destination) -> row indices, built once per matrix"""
+        if self._lanes is None:
+            keys = np.char.add(np.char.add(self.origin, '\x1f'), self.destination)
+            unique, inverse = np.unique(keys, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(unique.size + 1))
+            self._lanes = {
+                tuple(key.split('\x1f', 1)): order[bounds[i]:bounds[i + 1]]
+                for i, key in enumerate(unique.tolist())
+            }
+        return self._lanes
+
+    def lane_rows(self, origin: str, destination: str, mode: Optional[str] = None) -> np.ndarray:
+        rows = self.lanes().get((origin, destination), np.empty(0, dtype=np.intp))
+        if mode is not None:
+            rows = rows[self.mode[rows] == mode]
+        return rows
+
+    def lane_alternatives(self, origin: str, destination: str, mode: Optional[str] = None,
+                          min_quotes: int = 1) -> Tuple[List[str], np.ndarray]:
+        """
+        Forwarders quoting on a lane and their (avg_quote, quote_rate) rows, in QUOTE_CRITERIA order
+
+        Forwarders with fewer than min_quotes quotes on the lane are left out;
+        min_quotes=0 keeps all of them, with NaN avg_quote for rank_masked.
+        """
+        rows = self.lane_rows(origin, destination, mode)
+        quoted = self.quoted[rows]
+        counts = quoted.sum(axis=0)
+        keep = counts >= min_quotes
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_quote = np.where(quoted, self.quotes[rows], 0.0).sum(axis=0, dtype=np.float64) / counts
+            quote_rate = counts / len(rows) if len(rows) else np.zeros(len(self.forwarders))
+        names = [f for f, k in zip(self.forwarders, keep) if k]
+        matrix = np.column_stack([avg_quote, quote_rate])[keep]
+        return names, matrix
+
+    def lane_stack(self, lanes: Optional[Sequence[Tuple[str, str]]] = None,
+                   mode: Optional[str] = None) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+        """
+        Every forwarder on every lane as one (lanes x forwarders x QUOTE_CRITERIA) array
+
+        Forwarders that never quoted on a lane get NaN avg_quote, so the stack
+        feeds ranking.rank_batch_masked without dropping anyone. Built with a
+        single scatter-add over the rows, not a loop over lanes.
+        """
+        index = self.lanes()
+        keys = list(index) if lanes is None else [tuple(lane) for lane in lanes]
+        lane_of_row = np.full(len(self), -1, dtype=np.intp)
+        for i, key in enumerate(keys):
+            lane_of_row[index.get(key, np.empty(0, dtype=np.intp))] = i
+        rows = np.flatnonzero(lane_of_row >= 0)
+        if mode is not None:
+            rows = rows[self.mode[rows] == mode]
+        lane_ids = lane_of_row[rows]
+
+        totals = np.zeros((len(keys), len(self.forwarders)))
+        counts = np.zeros((len(keys), len(self.forwarders)))
+        shipments = np.bincount(lane_ids, minlength=len(keys)).astype(np.float64)
+        np.add.at(totals, lane_ids, np.where(self.quoted[rows], self.quotes[rows], 0.0))
+        np.add.at(counts, lane_ids, self.quoted[rows])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_quote = np.where(counts > 0, totals / counts, np.nan)
+            quote_rate = np.where(shipments[:, np.newaxis] > 0, counts / shipments[:, np.newaxis], 0.0)
+        return keys, np.stack([avg_quote, quote_rate], axis=2)
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
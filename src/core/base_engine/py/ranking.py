@@ -1,4 +1,6 @@
 # deepcal_engine/ranking.py
+import warnings
+
 import numpy as np
 
 class AlternativeRanking:
@@ -33,3 +35,156 @@ class AlternativeRanking:
         closeness = d_minus / (d_plus + d_minus)
 
         return sorted(zip(self.alternatives, closeness), key=lambda x: x[1], reverse=True)
+
+    def load_lane(self, quotes, origin, destination, mode=None, min_quotes=1):
+        """Load the forwarders quoting on one lane of a precomputed QuoteMatrix."""
+        names, matrix = quotes.lane_alternatives(origin, destination, mode=mode, min_quotes=min_quotes)
+        self.load_alternatives(names, matrix)
+        return self
+
+    def rank_masked(self, policy="ignore", missing=None, penalty=1.0):
+        """rank() tolerating missing cells (NaN, or True in `missing`); see rank_batch_masked."""
+        closeness, order = rank_batch_masked(
+            self.decision_matrix, self.weights, benefit_mask(self.criteria, self.benefit_flags),
+            missing=missing, policy=policy, penalty=penalty,
+        )
+        return [(self.alternatives[i], closeness[0, i]) for i in order[0]]
+
+    def rank_many(self, matrices):
+        """Rank a stack of matrices sharing this engine's criteria, weights and flags."""
+        return rank_batch(matrices, self.weights, benefit_mask(self.criteria, self.benefit_flags))
+
+
+def benefit_mask(criteria, benefit_flags):
+    """Boolean vector (True = higher is better) in criteria order."""
+    return np.array([bool(benefit_flags[c]) for c in criteria])
+
+
+def rank_batch(matrices, weights, benefit_mask):
+    """
+    TOPSIS over a stacked (batch x alternatives x criteria) array in one pass.
+
+    weights and benefit_mask may be given per batch (batch x criteria) or once
+    (criteria,) and broadcast. Returns (closeness, order) where closeness is
+    (batch x alternatives) and order holds alternative indices best-first,
+    ties kept in input order like AlternativeRanking.rank().
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    if matrices.ndim == 2:
+        matrices = matrices[np.newaxis]
+    if matrices.ndim != 3:
+        raise ValueError("matrices must be (batch x alternatives x criteria)")
+    n_batch, _, n_crit = matrices.shape
+
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), (n_batch, n_crit))
+    mask = np.broadcast_to(np.asarray(benefit_mask, dtype=bool), (n_batch, n_crit))
+
+    norm = np.linalg.norm(matrices, axis=1, keepdims=True)
+    normalized = matrices / norm
+    weighted = normalized * weights[:, np.newaxis, :]
+
+    col_max = weighted.max(axis=1)
+    col_min = weighted.min(axis=1)
+    ideal = np.where(mask, col_max, col_min)
+    anti_ideal = np.where(mask, col_min, col_max)
+
+    d_plus = np.linalg.norm(weighted - ideal[:, np.newaxis, :], axis=2)
+    d_minus = np.linalg.norm(weighted - anti_ideal[:, np.newaxis, :], axis=2)
+    closeness = d_minus / (d_plus + d_minus)
+
+    order = np.argsort(-closeness, axis=1, kind="stable")
+    return closeness, order
+
+
+# How rank_batch_masked treats missing cells:
+#   ignore  - norms, ideals and distances use only the cells that are present
+#   penalty - a missing cell sits `penalty` of the way from the ideal to the anti-ideal
+#   mean / median - impute the criterion's mean / median over present alternatives
+#   worst   - impute the worst present value (max for costs, min for benefits)
+MISSING_POLICIES = ("ignore", "penalty", "mean", "median", "worst")
+
+
+def missing_mask(matrices, missing=None):
+    """Missing cells: NaN, masked entries of a numpy masked array, or True in `missing`."""
+    if isinstance(matrices, np.ma.MaskedArray):
+        mask = np.ma.getmaskarray(matrices) | np.isnan(matrices.filled(np.nan))
+    else:
+        mask = np.isnan(np.asarray(matrices, dtype=float))
+    if missing is not None:
+        mask = mask | np.asarray(missing, dtype=bool)
+    return mask
+
+
+def impute(matrices, missing, benefit_mask, policy="mean"):
+    """Fill missing cells column-wise per batch; columns with nothing present become 0."""
+    present = ~missing
+    values = np.where(present, matrices, 0.0)
+    counts = present.sum(axis=1, keepdims=True)
+    if policy == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fill = values.sum(axis=1, keepdims=True) / counts
+    elif policy == "median":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            fill = np.nanmedian(np.where(present, matrices, np.nan), axis=1, keepdims=True)
+    elif policy == "worst":
+        high = np.where(present, matrices, -np.inf).max(axis=1, keepdims=True)
+        low = np.where(present, matrices, np.inf).min(axis=1, keepdims=True)
+        fill = np.where(np.asarray(benefit_mask, dtype=bool)[..., np.newaxis, :], low, high)
+    else:
+        raise ValueError(f"Unknown imputation policy {policy!r}")
+    fill = np.where(counts > 0, fill, 0.0)
+    return np.where(present, matrices, fill)
+
+
+def rank_batch_masked(matrices, weights, benefit_mask, missing=None, policy="ignore", penalty=1.0):
+    """
+    rank_batch for decision matrices with missing cells (e.g. "No Quote").
+
+    No alternative is dropped. Alternatives with nothing present under
+    "ignore" get NaN closeness and are ordered last. Returns (closeness, order)
+    like rank_batch.
+    """
+    if policy not in MISSING_POLICIES:
+        raise ValueError(f"Unknown missing-data policy {policy!r}; expected one of {MISSING_POLICIES}")
+    missing = missing_mask(matrices, missing)
+    matrices = np.ma.getdata(matrices).astype(float)
+    if matrices.ndim == 2:
+        matrices, missing = matrices[np.newaxis], missing[np.newaxis]
+    if matrices.ndim != 3:
+        raise ValueError("matrices must be (batch x alternatives x criteria)")
+    n_batch, _, n_crit = matrices.shape
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), (n_batch, n_crit))
+    mask = np.broadcast_to(np.asarray(benefit_mask, dtype=bool), (n_batch, n_crit))
+
+    if policy in ("mean", "median", "worst"):
+        matrices = impute(matrices, missing, mask, policy)
+        missing = np.zeros_like(missing)
+    present = ~missing
+
+    values = np.where(present, matrices, 0.0)
+    norm = np.sqrt(np.square(values).sum(axis=1, keepdims=True))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = np.where(norm > 0, values / norm, 0.0)
+    weighted = normalized * weights[:, np.newaxis, :]
+
+    any_present = present.any(axis=1)
+    col_max = np.where(any_present, np.where(present, weighted, -np.inf).max(axis=1), 0.0)
+    col_min = np.where(any_present, np.where(present, weighted, np.inf).min(axis=1), 0.0)
+    ideal = np.where(mask, col_max, col_min)[:, np.newaxis, :]
+    anti_ideal = np.where(mask, col_min, col_max)[:, np.newaxis, :]
+
+    if policy == "penalty":
+        weighted = np.where(present, weighted, ideal + penalty * (anti_ideal - ideal))
+        counted = np.ones_like(present)
+    else:
+        counted = present
+
+    d_plus = np.sqrt(np.where(counted, np.square(weighted - ideal), 0.0).sum(axis=2))
+    d_minus = np.sqrt(np.where(counted, np.square(weighted - anti_ideal), 0.0).sum(axis=2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        closeness = d_minus / (d_plus + d_minus)
+    closeness = np.where(counted.any(axis=2), closeness, np.nan)
+
+    order = np.argsort(np.where(np.isnan(closeness), np.inf, -closeness), axis=1, kind="stable")
+    return closeness, order
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""DeepCAL ranking API – local asyncio HTTP service
+
+Wraps CriteriaWeighting + AlternativeRanking + calculation_validator behind
+POST /rank, so the UI and RFQ builder can rank without spawning Python per
+request. Identical in-flight requests share one computation, finished
+results sit in a TTL/LRU cache keyed on the request content, and the NumPy
+work runs in a thread pool so the event loop keeps accepting connections.
+
+Usage:
+  python ranking_api.py --port 8780 --workers 4 --cache-size 1024 --ttl 300
+
+Request body (POST /rank):
+  {
+    "criteria": ["Cost", "Reliability", "Responsiveness"],
+    "alternatives": ["A", "B", "C"],
+    "decisionMatrix": [[1200, 92, 5], [1000, 85, 9], [1300, null, 3]],
+    "criteriaTypes": ["cost", "benefit", "cost"],
+    one of:
+      "weights": [0.4, 0.4, 0.2],
+      "judgments": {"Cost>Reliability": [0.3, 0.1, 0.6], ...},
+      "pairwiseMatrix": [[1, 2, 3], [0.5, 1, 2], [0.33, 0.5, 1]],
+    "solver": "mean",              (optional, AHP solver)
+    "missingPolicy": "penalty"     (optional, used when cells are null)
+  }
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+CUR_DIR = Path(__file__).resolve().parent
+if str(CUR_DIR) not in sys.path:
+    sys.path.insert(0, str(CUR_DIR))
+
+from ranking import MISSING_POLICIES, AlternativeRanking
+from weight_cache import WeightCache
+from weighting import SOLVERS, CriteriaWeighting, solve_batch
+
+# Validation helpers (one directory up), as in cli_validate_decision.py
+VALIDATOR_PATH = CUR_DIR.parent / "utils" / "calculation_validator.py"
+sys.path.insert(0, str(VALIDATOR_PATH.parent))
+from calculation_validator import validate_matrix, validate_scores, validate_weights
+
+MAX_BODY_BYTES = 1 << 20
+DEFAULT_PORT = 8780
+
+
+class RequestError(ValueError):
+    """Malformed ranking request; reported to the client as 400."""
+
+
+class TTLCache:
+    """Bounded LRU whose entries also expire `ttl` seconds after insertion."""
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: bytes):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- Ranking pipeline (runs in the thread pool) -------------------------------
+
+def normalize_request(body: Dict) -> Dict:
+    """Validate and canonicalise a /rank body; the result is hashed for caching."""
+    try:
+        criteria = [str(c) for c in body["criteria"]]
+        matrix = [[np.nan if v is None else float(v) for v in row] for row in body["decisionMatrix"]]
+    except (KeyError, TypeError, ValueError) as e:
+        raise RequestError(f"criteria and numeric decisionMatrix are required ({e})")
+    if not matrix or any(len(row) != len(criteria) for row in matrix):
+        raise RequestError("decisionMatrix rows must have one value per criterion")
+
+    if "criteriaTypes" in body:
+        types = body["criteriaTypes"]
+        if (not isinstance(types, list) or len(types) != len(criteria)
+                or any(t not in ("benefit", "cost") for t in types)):
+            raise RequestError("criteriaTypes must be 'benefit' or 'cost' per criterion")
+        benefit = [t == "benefit" for t in types]
+    elif "benefit" in body:
+        missing = [c for c in criteria if not isinstance(body["benefit"], dict) or c not in body["benefit"]]
+        if missing:
+            raise RequestError(f"benefit map is missing criteria {missing}")
+        benefit = [bool(body["benefit"][c]) for c in criteria]
+    else:
+        raise RequestError("criteriaTypes (or a benefit map) is required")
+
+    solver = body.get("solver", "mean")
+    if solver not in SOLVERS:
+        raise RequestError(f"solver must be one of {SOLVERS}")
+    policy = body.get("missingPolicy", "penalty")
+    if policy not in MISSING_POLICIES:
+        raise RequestError(f"missingPolicy must be one of {MISSING_POLICIES}")
+
+    sources = [k for k in ("weights", "judgments", "pairwiseMatrix") if k in body]
+    if len(sources) != 1:
+        raise RequestError("give exactly one of weights, judgments or pairwiseMatrix")
+    names = body.get("alternatives") or [f"A{i + 1}" for i in range(len(matrix))]
+    if len(names) != len(matrix):
+        raise RequestError("alternatives must name every decisionMatrix row")
+    return {
+        "criteria": criteria,
+        "alternatives": [str(n) for n in names],
+        "matrix": matrix,
+        "benefit": benefit,
+        "solver": solver,
+        "missing_policy": policy,
+        sources[0]: _weight_source(sources[0], body[sources[0]], criteria),
+    }
+
+
+def _weight_source(kind: str, value, criteria: List[str]):
+    """Check the weights/judgments/pairwiseMatrix value against the criteria and return it as plain floats."""
+    n = len(criteria)
+    if kind == "judgments":
+        if not isinstance(value, dict):
+            raise RequestError("judgments must map 'A>B' to [T, I, F]")
+        judgments = {}
+        for pair, tnn in value.items():
+            a, _, b = str(pair).partition(">")
+            if a not in criteria or b not in criteria:
+                raise RequestError(f"judgment {pair!r} must be 'A>B' over known criteria")
+            try:
+                components = [float(v) for v in tnn]
+            except (TypeError, ValueError):
+                components = []
+            if len(components) != 3 or not np.isfinite(components).all():
+                raise RequestError(f"judgment {pair!r} must be three numbers [T, I, F]")
+            judgments[f"{a}>{b}"] = components
+        return judgments
+    try:
+        values = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        raise RequestError(f"{kind} must be numeric")
+    if not np.isfinite(values).all():
+        raise RequestError(f"{kind} must be finite")
+    if kind == "weights" and values.shape != (n,):
+        raise RequestError("weights must have one entry per criterion")
+    if kind == "pairwiseMatrix" and values.shape != (n, n):
+        raise RequestError("pairwiseMatrix must be criteria x criteria")
+    return values.tolist()
+
+
+def request_key(request: Dict) -> str:
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def derive_weights(request: Dict, weight_cache: Optional[WeightCache]) -> Tuple[np.ndarray, float]:
+    criteria = request["criteria"]
+    if "weights" in request:
+        return np.asarray(request["weights"], dtype=float), 0.0
+    if "pairwiseMatrix" in request:
+        pairwise = np.asarray(request["pairwiseMatrix"], dtype=float)
+        weights, cr = solve_batch(pairwise[np.newaxis], request["solver"])
+        return weights[0], float(cr[0])
+    judgments = {tuple(pair.split(">", 1)): tuple(tnn) for pair, tnn in request["judgments"].items()}
+    engine = CriteriaWeighting(criteria, judgments, cache=weight_cache, method=request["solver"])
+    weights = engine.compute_weights()
+    return weights, engine.consistency_ratio(weights)
+
+
+def rank_request(request: Dict, weight_cache: Optional[WeightCache] = None) -> Dict:
+    """Weights -> TOPSIS -> validation for one normalised request."""
+    criteria = request["criteria"]
+    weights, cr = derive_weights(request, weight_cache)
+    if not np.isfinite(weights).all():
+        raise RequestError("weights could not be derived (degenerate comparisons)")
+    matrix = np.asarray(request["matrix"], dtype=float)
+    engine = AlternativeRanking(criteria, weights, dict(zip(criteria, request["benefit"])))
+    engine.load_alternatives(request["alternatives"], matrix)
+    if np.isnan(matrix).any():
+        results = engine.rank_masked(policy=request["missing_policy"])
+    else:
+        results = engine.rank()
+
+    scores = [float(score) for _, score in results]
+    weights_dict = dict(zip(criteria, [float(w) for w in weights]))
+    valid = {
+        "matrix": validate_matrix(matrix.tolist()),
+        "weights": validate_weights(weights_dict),
+        "scores": validate_scores([s for s in scores if not np.isnan(s)]),
+    }
+    return {
+        "rankings": [
+            {"name": name, "score": None if np.isnan(score) else score, "rank": i}
+            for i, ((name, _), score) in enumerate(zip(results, scores), start=1)
+        ],
+        "weights": weights_dict,
+        "consistencyRatio": None if np.isnan(cr) else cr,
+        "valid": valid,
+    }
+
+
+# --- Service ------------------------------------------------------------------
+
+class RankingService:
+    """Coalescing, caching front of rank_request, driven from the event loop."""
+
+    def __init__(self, workers=4, cache_size=1024, ttl=300.0):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deepcal-rank")
+        self.cache = TTLCache(cache_size, ttl)
+        self.weight_cache = WeightCache()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def rank(self, body: Dict) -> bytes:
+        request = normalize_request(body)
+        key = request_key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, rank_request, request, self.weight_cache)
+            payload = json.dumps(result).encode("utf-8")
+            self.computed += 1
+            self.cache.put(key, payload)
+            future.set_result(payload)
+            return payload
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict:
+        return {
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache.hits,
+            "cache_size": len(self.cache),
+            "in_flight": len(self._inflight),
+            "weight_cache": self.weight_cache.stats(),
+        }
+
+    # Minimal HTTP/1.1 with keep-alive on asyncio streams; enough for a local client
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, version = (lines[0].split(" ") + ["", "", ""])[:3]
+                headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b'{"error": "body too large"}', False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, payload = await self._dispatch(method, path.split("?", 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, bytes]:
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, json.dumps(self.stats()).encode("utf-8")
+        if path != "/rank":
+            return HTTPStatus.NOT_FOUND, b'{"error": "not found"}'
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, b'{"error": "POST a ranking request"}'
+        try:
+            return HTTPStatus.OK, await self.rank(json.loads(body or b"{}"))
+        except (RequestError, json.JSONDecodeError) as e:
+            return HTTPStatus.BAD_REQUEST, json.dumps({"error": str(e)}).encode("utf-8")
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: bytes, keep_alive: bool):
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="DeepCAL local ranking API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=4, help="Threads for ranking work")
+    p.add_argument("--cache-size", type=int, default=1024, help="Cached ranking responses")
+    p.add_argument("--ttl", type=float, default=300.0, help="Seconds a cached response stays valid")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    service = RankingService(workers=args.workers, cache_size=args.cache_size, ttl=args.ttl)
+    print(f"DeepCAL ranking API on http://{args.host}:{args.port}/rank")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nRanking API stopped.")
+    finally:
+        service.executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# deepcal_engine/ranking_session.py
+import numpy as np
+
+
+class RankingSession:
+    """
+    Stateful TOPSIS ranking for live RFQ windows.
+
+    Keeps column sum-of-squares, per-criterion extrema and squared weighted
+    distances to the ideal/anti-ideal points so a single quote can be applied
+    without re-ranking from scratch. With vector normalisation every change to
+    a column rescales that whole column, so:
+
+      * update_cell()              -> O(alternatives), one column refreshed
+      * add/update/remove a row    -> one vectorised pass over the distances,
+                                      norms and extrema are updated in place
+
+    Column extrema are only rescanned when the changed value was the current
+    min or max. Results match AlternativeRanking.rank() up to float rounding;
+    rebuild() resets any drift and runs automatically every `rebuild_every`
+    cell updates.
+    """
+
+    def __init__(self, criteria, weights, benefit_flags, names=(), matrix=None, rebuild_every=1000):
+        self.criteria = list(criteria)
+        self.weights = np.asarray(weights, dtype=float)
+        self.benefit_flags = benefit_flags
+        self.rebuild_every = rebuild_every
+
+        self._col = {c: j for j, c in enumerate(self.criteria)}
+        self._benefit = np.array([bool(benefit_flags[c]) for c in self.criteria])
+        self._names = list(names)
+        self._row = {name: i for i, name in enumerate(self._names)}
+        n_crit = len(self.criteria)
+        if matrix is None:
+            matrix = np.empty((len(self._names), n_crit))
+        self._x = np.array(matrix, dtype=float).reshape(len(self._names), n_crit)
+        self._pending = 0
+        self.rebuild()
+
+    # --- Public API --------------------------------------------------------
+    @property
+    def alternatives(self):
+        return list(self._names)
+
+    @property
+    def decision_matrix(self):
+        return self._x.copy()
+
+    def rebuild(self):
+        """Recompute every cached statistic from the raw matrix."""
+        self._sumsq = np.einsum("ij,ij->j", self._x, self._x)
+        if len(self._names):
+            self._max = self._x.max(axis=0)
+            self._min = self._x.min(axis=0)
+        else:
+            self._max = np.full(len(self.criteria), -np.inf)
+            self._min = np.full(len(self.criteria), np.inf)
+        self._refresh_distances()
+        self._pending = 0
+
+    def add_alternative(self, name, row):
+        if name in self._row:
+            raise ValueError(f"Alternative {name!r} already exists")
+        row = self._as_row(row)
+        self._x = np.vstack([self._x, row])
+        self._names.append(name)
+        self._row[name] = len(self._names) - 1
+        self._sumsq += row * row
+        np.maximum(self._max, row, out=self._max)
+        np.minimum(self._min, row, out=self._min)
+        self._refresh_distances()
+
+    def update_alternative(self, name, row):
+        i = self._index(name)
+        row = self._as_row(row)
+        old = self._x[i].copy()
+        self._x[i] = row
+        self._sumsq += row * row - old * old
+        self._update_extrema(old, row)
+        self._refresh_distances()
+
+    def remove_alternative(self, name):
+        i = self._index(name)
+        old = self._x[i].copy()
+        self._x = np.delete(self._x, i, axis=0)
+        del self._names[i]
+        self._row = {n: k for k, n in enumerate(self._names)}
+        self._sumsq -= old * old
+        np.maximum(self._sumsq, 0.0, out=self._sumsq)
+        if not self._names:
+            self.rebuild()
+            return
+        stale = (old >= self._max) | (old <= self._min)
+        self._rescan_extrema(np.flatnonzero(stale))
+        self._refresh_distances()
+
+    def update_cell(self, name, criterion, value):
+        i = self._index(name)
+        j = self._col[criterion]
+        value = float(value)
+        old_value = self._x[i, j]
+
+        col = self._x[:, j]
+        old_dp = self._scale2[j] * (col - self._ideal_raw(j)) ** 2
+        old_dm = self._scale2[j] * (col - self._anti_raw(j)) ** 2
+
+        col[i] = value
+        self._sumsq[j] += value * value - old_value * old_value
+        if value > self._max[j]:
+            self._max[j] = value
+        elif old_value >= self._max[j] and value < old_value:
+            self._rescan_extrema([j])
+        if value < self._min[j]:
+            self._min[j] = value
+        elif old_value <= self._min[j] and value > old_value:
+            self._rescan_extrema([j])
+
+        self._scale2[j] = (self.weights[j] / np.sqrt(self._sumsq[j])) ** 2
+        self._dp2 += self._scale2[j] * (col - self._ideal_raw(j)) ** 2 - old_dp
+        self._dm2 += self._scale2[j] * (col - self._anti_raw(j)) ** 2 - old_dm
+
+        self._pending += 1
+        if self.rebuild_every and self._pending >= self.rebuild_every:
+            self.rebuild()
+
+    def closeness(self):
+        """Closeness scores aligned with `alternatives`."""
+        d_plus = np.sqrt(np.maximum(self._dp2, 0.0))
+        d_minus = np.sqrt(np.maximum(self._dm2, 0.0))
+        return d_minus / (d_plus + d_minus)
+
+    def rank(self):
+        """Same output shape as AlternativeRanking.rank()."""
+        return sorted(zip(self._names, self.closeness()), key=lambda x: x[1], reverse=True)
+
+    # --- Internals ---------------------------------------------------------
+    def _index(self, name):
+        try:
+            return self._row[name]
+        except KeyError:
+            raise KeyError(f"Unknown alternative {name!r}") from None
+
+    def _as_row(self, row):
+        row = np.asarray(row, dtype=float)
+        if row.shape != (len(self.criteria),):
+            raise ValueError(f"Expected {len(self.criteria)} criteria values, got shape {row.shape}")
+        return row
+
+    def _ideal_raw(self, j):
+        return self._max[j] if self._benefit[j] else self._min[j]
+
+    def _anti_raw(self, j):
+        return self._min[j] if self._benefit[j] else self._max[j]
+
+    def _update_extrema(self, old, new):
+        grew = new > self._max
+        self._max[grew] = new[grew]
+        shrank = new < self._min
+        self._min[shrank] = new[shrank]
+        stale = ((old >= self._max) & (new < old)) | ((old <= self._min) & (new > old))
+        self._rescan_extrema(np.flatnonzero(stale))
+
+    def _rescan_extrema(self, cols):
+        for j in cols:
+            self._max[j] = self._x[:, j].max()
+            self._min[j] = self._x[:, j].min()
+
+    def _refresh_distances(self):
+        with np.errstate(divide="ignore"):  # empty session: zero-norm columns
+            self._scale2 = (self.weights / np.sqrt(self._sumsq)) ** 2
+        ideal = np.where(self._benefit, self._max, self._min)
+        anti_ideal = np.where(self._benefit, self._min, self._max)
+        self._dp2 = ((self._x - ideal) ** 2) @ self._scale2
+        self._dm2 = ((self._x - anti_ideal) ** 2) @ self._scale2
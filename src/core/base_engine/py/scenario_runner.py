@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""DeepCAL scenario runner – rank many lanes in parallel
+
+Fans neutrosophic-AHP weighting, masked TOPSIS and output validation for a
+manifest of scenarios (lane x mode x criteria set x judgment set) out over a
+process pool. Lane features live in shared memory so workers read them
+without pickling, and every worker writes its chunk straight into shared
+output arrays that are gathered into one long, columnar result table.
+
+Usage (all flags optional; the default re-ranks every origin/destination/mode):
+  python scenario_runner.py \
+      --shipments ../../base_data/deeptrack_3.json \
+      --manifest scenarios.json \
+      --processes 8 \
+      --output rankings.parquet
+
+Manifest layout:
+  {
+    "criteria_sets": {"quotes": {"criteria": ["avg_quote", "quote_rate"],
+                                 "benefit": {"avg_quote": false, "quote_rate": true}}},
+    "judgment_sets": {"cost_first": {"avg_quote>quote_rate": [0.7, 0.1, 0.2]}},
+    "scenarios": "all" | [{"origin": "Kenya", "destination": "Zambia", "mode": "Air",
+                           "criteria_set": "quotes", "judgment_set": "cost_first"}],
+    "missing_policy": "penalty"
+  }
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CUR_DIR = Path(__file__).resolve().parent
+if str(CUR_DIR) not in sys.path:
+    sys.path.insert(0, str(CUR_DIR))
+
+from quote_matrix import QUOTE_BENEFIT, QUOTE_CRITERIA, QuoteMatrix
+from ranking import MISSING_POLICIES, rank_batch_masked
+from weight_cache import judgment_key
+from weighting import SOLVERS, CriteriaWeighting
+
+DEFAULT_SHIPMENTS = CUR_DIR.parents[1] / "base_data" / "deeptrack_3.json"
+DEFAULT_CHUNK_SIZE = 4096
+MAX_CONSISTENCY_RATIO = 0.1
+WEIGHT_SUM_TOLERANCE = 0.05  # same allowance as calculation_validator.validate_weights
+
+DEFAULT_MANIFEST = {
+    "criteria_sets": {
+        "quotes": {"criteria": list(QUOTE_CRITERIA), "benefit": QUOTE_BENEFIT},
+    },
+    "judgment_sets": {
+        "balanced": {"avg_quote>quote_rate": [0.6, 0.2, 0.3]},
+    },
+    "scenarios": "all",
+    "missing_policy": "penalty",
+}
+
+
+# --- Shared memory -----------------------------------------------------------
+
+class SharedArray:
+    """A numpy array backed by a named shared-memory block, attachable from workers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape, dtype, owner: bool):
+        self.shm = shm
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.owner = owner
+
+    @classmethod
+    def create(cls, shape, dtype, fill=0) -> "SharedArray":
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        shared = cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype, owner=True)
+        shared.array.fill(fill)
+        return shared
+
+    @classmethod
+    def attach(cls, spec) -> "SharedArray":
+        name, shape, dtype = spec
+        return cls(_attach_untracked(name), shape, dtype, owner=False)
+
+    @property
+    def spec(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Open an existing block without registering it with the resource tracker
+
+    Only the creating process unlinks; a tracked attach would make the
+    tracker unlink (or warn about) the block when a worker exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+# --- Manifest ----------------------------------------------------------------
+
+def parse_judgments(raw: Dict[str, List[float]]) -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+    """{"A>B": [T, I, F]} -> {("A", "B"): (T, I, F)} as CriteriaWeighting expects."""
+    judgments = {}
+    for pair, tnn in raw.items():
+        a, b = (part.strip() for part in pair.split(">", 1))
+        judgments[(a, b)] = tuple(float(v) for v in tnn)
+    return judgments
+
+
+def load_manifest(path: Optional[str]) -> Dict:
+    if not path:
+        return DEFAULT_MANIFEST
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    return {**DEFAULT_MANIFEST, **manifest}
+
+
+def lane_features(quotes: QuoteMatrix) -> Tuple[List[Tuple[str, str, str]], np.ndarray]:
+    """Every (origin, destination, mode) with shipments and its (forwarders x QUOTE_CRITERIA) block."""
+    keys, blocks = [], []
+    for mode in sorted(set(quotes.mode.tolist())):
+        lanes = [lane for lane, rows in quotes.lanes().items() if (quotes.mode[rows] == mode).any()]
+        if not lanes:
+            continue
+        _, stack = quotes.lane_stack(lanes, mode=mode)
+        keys.extend((origin, destination, mode) for origin, destination in lanes)
+        blocks.append(stack)
+    features = np.concatenate(blocks) if blocks else np.empty((0, len(quotes.forwarders), len(QUOTE_CRITERIA)))
+    return keys, features
+
+
+def expand_scenarios(manifest: Dict, lane_keys: List[Tuple[str, str, str]]) -> pd.DataFrame:
+    """One row per scenario: lane index plus criteria/judgment set names."""
+    if manifest["scenarios"] == "all":
+        sets = [(c, j) for c in manifest["criteria_sets"] for j in manifest["judgment_sets"]]
+        return pd.DataFrame({
+            "lane": np.repeat(np.arange(len(lane_keys)), len(sets)),
+            "criteria_set": np.tile([c for c, _ in sets], len(lane_keys)),
+            "judgment_set": np.tile([j for _, j in sets], len(lane_keys)),
+        })
+    index = {key: i for i, key in enumerate(lane_keys)}
+    rows = []
+    for spec in manifest["scenarios"]:
+        key = (spec["origin"], spec["destination"], spec["mode"])
+        if key not in index:
+            print(f"[WARN] No shipments for lane {key}; scenario skipped")
+            continue
+        rows.append({"lane": index[key], "criteria_set": spec["criteria_set"],
+                     "judgment_set": spec["judgment_set"]})
+    return pd.DataFrame(rows, columns=["lane", "criteria_set", "judgment_set"])
+
+
+# --- Workers -----------------------------------------------------------------
+
+_WEIGHTS: Dict[str, Tuple[np.ndarray, float]] = {}
+
+
+def _weights(criteria_set: str, judgment_set: str, manifest: Dict, method: str) -> Tuple[np.ndarray, float]:
+    """
+    AHP weights and consistency ratio, solved once per distinct problem per worker.
+
+    Keyed on the content of the criteria and judgments plus the solver (not
+    the set names), so a later run that reuses a name with new judgments
+    never gets the previous run's weights, in this process or a forked worker.
+    """
+    criteria = manifest["criteria_sets"][criteria_set]["criteria"]
+    judgments = {
+        pair: tnn for pair, tnn in parse_judgments(manifest["judgment_sets"][judgment_set]).items()
+        if pair[0] in criteria and pair[1] in criteria
+    }
+    key = judgment_key(criteria, judgments, method)
+    if key not in _WEIGHTS:
+        if len(criteria) == 1:
+            _WEIGHTS[key] = np.ones(1), 0.0
+        else:
+            _WEIGHTS[key] = CriteriaWeighting(criteria, judgments, method=method).solve()
+    return _WEIGHTS[key]
+
+
+def _run_chunk(task) -> int:
+    """Weight, rank and validate scenarios [start, stop) into the shared outputs."""
+    start, stop = task["bounds"]
+    features = SharedArray.attach(task["features"])
+    scenarios = SharedArray.attach(task["scenarios"])
+    outputs = {name: SharedArray.attach(spec) for name, spec in task["outputs"].items()}
+    try:
+        manifest, feature_names = task["manifest"], task["feature_names"]
+        lanes, criteria_codes, judgment_codes = scenarios.array[start:stop].T
+        for c, j in np.unique(np.column_stack([criteria_codes, judgment_codes]), axis=0).tolist():
+            rows = np.flatnonzero((criteria_codes == c) & (judgment_codes == j))
+            criteria_set, judgment_set = task["criteria_sets"][c], task["judgment_sets"][j]
+            spec = manifest["criteria_sets"][criteria_set]
+            columns = [feature_names.index(c) for c in spec["criteria"]]
+            benefit = [bool(spec["benefit"][c]) for c in spec["criteria"]]
+            weights, cr = _weights(criteria_set, judgment_set, manifest, task["method"])
+
+            matrices = features.array[lanes[rows]][:, :, columns]
+            closeness, order = rank_batch_masked(matrices, weights, benefit, policy=manifest["missing_policy"])
+            ranks = np.empty_like(order)
+            np.put_along_axis(ranks, order, np.arange(order.shape[1])[np.newaxis], axis=1)
+
+            scores_ok = np.all(np.isnan(closeness) | ((closeness >= 0) & (closeness <= 1)), axis=1)
+            weights_ok = abs(float(np.sum(weights)) - 1.0) <= WEIGHT_SUM_TOLERANCE
+            out = start + rows
+            outputs["closeness"].array[out] = closeness
+            outputs["rank"].array[out] = ranks + 1
+            outputs["consistency_ratio"].array[out] = cr
+            outputs["valid"].array[out] = scores_ok & weights_ok & (cr <= MAX_CONSISTENCY_RATIO)
+        return stop - start
+    finally:
+        features.close()
+        scenarios.close()
+        for shared in outputs.values():
+            shared.close()
+
+
+# --- Runner ------------------------------------------------------------------
+
+class ScenarioRunner:
+    """
+    Rank every scenario of a manifest over a process pool.
+
+    run() returns one long table with a row per (scenario, forwarder):
+    origin, destination, mode, criteria_set, judgment_set, forwarder,
+    closeness, rank, consistency_ratio, valid.
+    """
+
+    def __init__(self, quotes: QuoteMatrix, manifest: Optional[Dict] = None, method: str = "mean"):
+        self.quotes = quotes
+        self.manifest = manifest or DEFAULT_MANIFEST
+        self.method = method
+        if self.manifest["missing_policy"] not in MISSING_POLICIES:
+            raise ValueError(f"Unknown missing_policy {self.manifest['missing_policy']!r}")
+        self.lane_keys, self.features = lane_features(quotes)
+
+    def run(self, processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+        scenarios = expand_scenarios(self.manifest, self.lane_keys)
+        n_scen, n_alt = len(scenarios), len(self.quotes.forwarders)
+        features = SharedArray.create(self.features.shape, np.float64)
+        features.array[:] = self.features
+        criteria_codes = pd.Categorical(scenarios["criteria_set"])
+        judgment_codes = pd.Categorical(scenarios["judgment_set"])
+        codes = SharedArray.create((n_scen, 3), np.int32)
+        codes.array[:] = np.column_stack([scenarios["lane"], criteria_codes.codes, judgment_codes.codes])
+        outputs = {
+            "closeness": SharedArray.create((n_scen, n_alt), np.float64, fill=np.nan),
+            "rank": SharedArray.create((n_scen, n_alt), np.int32),
+            "consistency_ratio": SharedArray.create((n_scen,), np.float64, fill=np.nan),
+            "valid": SharedArray.create((n_scen,), np.bool_, fill=False),
+        }
+        try:
+            shared = {
+                "features": features.spec,
+                "scenarios": codes.spec,
+                "outputs": {name: out.spec for name, out in outputs.items()},
+                "manifest": self.manifest,
+                "feature_names": list(QUOTE_CRITERIA),
+                "method": self.method,
+                "criteria_sets": list(criteria_codes.categories),
+                "judgment_sets": list(judgment_codes.categories),
+            }
+            tasks = [{**shared, "bounds": (i, min(i + chunk_size, n_scen))} for i in range(0, n_scen, chunk_size)]
+            processes = processes or os.cpu_count() or 1
+            if processes > 1 and len(tasks) > 1:
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    list(pool.map(_run_chunk, tasks))
+            else:
+                for task in tasks:
+                    _run_chunk(task)
+            return self._gather(scenarios, {name: out.array.copy() for name, out in outputs.items()})
+        finally:
+            features.close()
+            codes.close()
+            for out in outputs.values():
+                out.close()
+
+    def _gather(self, scenarios: pd.DataFrame, results: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Long (scenario x forwarder) table; label columns are categoricals built from codes."""
+        n_alt = len(self.quotes.forwarders)
+        lane_rows = scenarios["lane"].to_numpy()
+        lanes = np.asarray(self.lane_keys, dtype=object).reshape(-1, 3)
+
+        def lane_column(i):
+            codes, labels = pd.factorize(lanes[:, i])
+            return pd.Categorical.from_codes(np.repeat(codes[lane_rows], n_alt), labels)
+
+        def label_column(values):
+            categorical = pd.Categorical(values)
+            return pd.Categorical.from_codes(np.repeat(categorical.codes, n_alt), categorical.categories)
+
+        repeat = lambda values: np.repeat(np.asarray(values), n_alt)
+        forwarders = pd.Categorical.from_codes(np.tile(np.arange(n_alt), len(scenarios)), self.quotes.forwarders)
+        return pd.DataFrame({
+            "scenario": repeat(np.arange(len(scenarios))),
+            "origin": lane_column(0),
+            "destination": lane_column(1),
+            "mode": lane_column(2),
+            "criteria_set": label_column(scenarios["criteria_set"]),
+            "judgment_set": label_column(scenarios["judgment_set"]),
+            "forwarder": forwarders,
+            "closeness": results["closeness"].ravel(),
+            "rank": results["rank"].ravel(),
+            "consistency_ratio": repeat(results["consistency_ratio"]),
+            "valid": repeat(results["valid"]),
+        })
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="DeepCAL parallel scenario runner")
+    p.add_argument("--shipments", default=str(DEFAULT_SHIPMENTS), help="Shipments JSON export with forwarder quotes")
+    p.add_argument("--manifest", help="Scenario manifest JSON (default: every lane/mode, balanced judgments)")
+    p.add_argument("--solver", choices=SOLVERS, default="mean", help="AHP weight solver (default: mean)")
+    p.add_argument("--processes", type=int, help="Worker processes (default: all cores)")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Scenarios per dispatched task")
+    p.add_argument("--quote-cache", help="Directory for the parsed quote-matrix cache")
+    p.add_argument("--output", help="Write results to .parquet or .csv")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    quotes = QuoteMatrix.from_json(args.shipments, cache_dir=args.quote_cache)
+    runner = ScenarioRunner(quotes, load_manifest(args.manifest), method=args.solver)
+    results = runner.run(processes=args.processes, chunk_size=args.chunk_size)
+
+    n_scen = results["scenario"].nunique()
+    n_valid = int(results.groupby("scenario")["valid"].first().sum())
+    print(f"Ranked {n_scen} scenarios across {len(runner.lane_keys)} lanes ({n_valid} valid)")
+    best = results[results["rank"] == 1]
+    print(best[["origin", "destination", "mode", "judgment_set", "forwarder", "closeness"]].head(20).to_string(index=False))
+
+    if args.output:
+        if args.output.endswith(".parquet"):
+            results.to_parquet(args.output, index=False)
+        else:
+            results.to_csv(args.output, index=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# deepcal_engine/sensitivity.py
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ranking import benefit_mask, rank_batch_masked
+from weighting import solve_batch
+
+SAMPLING_MODES = ("tnn", "dirichlet")
+DEFAULT_CHUNK_SIZE = 25_000
+
+
+def sample_tnn_weights(criteria, tnn_judgments, n_samples, method="mean", rng=None):
+    """
+    Weight vectors drawn from the indeterminacy of each (T, I, F) judgment.
+
+    T and F may each be off by up to I, so the score T - F is drawn
+    uniformly from [T - F - I, T - F + I] (clipped to [-1, 1]), turned into
+    a comparison matrix as in CriteriaWeighting and solved in one batch.
+    Returns (weights, consistency_ratio) with shapes (n x criteria) and (n,).
+    """
+    rng = np.random.default_rng(rng)
+    index = {c: i for i, c in enumerate(criteria)}
+    n = len(criteria)
+    matrices = np.ones((n_samples, n, n))
+    for (a, b), (t, i, f) in tnn_judgments.items():
+        score = t - f
+        s = rng.uniform(max(score - i, -1.0), min(score + i, 1.0), size=n_samples)
+        val = np.where(s >= 0, 1 + s, 1 / (1 - s))
+        matrices[:, index[a], index[b]] = val
+        matrices[:, index[b], index[a]] = 1 / val
+    return solve_batch(matrices, method)
+
+
+def sample_dirichlet_weights(weights, n_samples, concentration=100.0, rng=None):
+    """Weight vectors from a Dirichlet centred on `weights`; larger concentration = tighter."""
+    rng = np.random.default_rng(rng)
+    alpha = np.maximum(np.asarray(weights, dtype=float), 1e-9) * concentration
+    return rng.dirichlet(alpha, size=n_samples)
+
+
+def closeness_samples(matrix, weight_samples, benefit):
+    """
+    TOPSIS closeness of one (alternatives x criteria) matrix under many weight vectors.
+
+    With non-negative weights the ideal scales with w, so both distances
+    reduce to (w ** 2) @ (normalized - ideal) ** 2: one matrix product for
+    all samples instead of a (samples x alternatives x criteria) stack.
+    Matrices with missing cells go through rank_batch_masked instead.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    weight_samples = np.asarray(weight_samples, dtype=float)
+    if np.isnan(matrix).any() or (weight_samples < 0).any():
+        stack = np.broadcast_to(matrix, (len(weight_samples),) + matrix.shape)
+        return rank_batch_masked(stack, weight_samples, benefit)[0]
+    normalized = matrix / np.linalg.norm(matrix, axis=0)
+    benefit = np.asarray(benefit, dtype=bool)
+    col_max, col_min = normalized.max(axis=0), normalized.min(axis=0)
+    ideal = np.where(benefit, col_max, col_min)
+    anti_ideal = np.where(benefit, col_min, col_max)
+    w2 = np.square(weight_samples)
+    d_plus = np.sqrt(w2 @ np.square(normalized - ideal).T)
+    d_minus = np.sqrt(w2 @ np.square(normalized - anti_ideal).T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return d_minus / (d_plus + d_minus)
+
+
+def _rank_chunk(args):
+    """Worker: rank-position counts and closeness moments for one slice of samples."""
+    matrix, weight_samples, benefit = args
+    closeness = closeness_samples(matrix, weight_samples, benefit)
+    n_alt = closeness.shape[1]
+    order = np.argsort(np.where(np.isnan(closeness), np.inf, -closeness), axis=1, kind="stable")
+    # order[s, k] is the alternative in position k; count (alternative, position) pairs
+    flat = order * n_alt + np.arange(n_alt)
+    counts = np.bincount(flat.ravel(), minlength=n_alt * n_alt).reshape(n_alt, n_alt)
+    filled = np.nan_to_num(closeness)
+    return counts, filled.sum(axis=0), np.square(filled).sum(axis=0)
+
+
+class SensitivityResult:
+    """
+    Rank stability of each alternative over the sampled weights.
+
+    rank_counts[a, k] is how many samples put alternative a in position k
+    (0 = best). base_order is the point-estimate ranking under the AHP weights.
+    """
+
+    def __init__(self, names, rank_counts, closeness_sum, closeness_sumsq, base_order):
+        self.names = list(names)
+        self.rank_counts = rank_counts
+        self.n_samples = int(rank_counts[:, 0].sum())
+        self.closeness_mean = closeness_sum / self.n_samples
+        self.closeness_std = np.sqrt(np.maximum(closeness_sumsq / self.n_samples - self.closeness_mean ** 2, 0.0))
+        self.base_order = list(base_order)
+
+    def rank_probabilities(self):
+        """(alternatives x positions) probability of each alternative landing in each position."""
+        return self.rank_counts / self.n_samples
+
+    def p_best(self):
+        return dict(zip(self.names, self.rank_probabilities()[:, 0].tolist()))
+
+    def expected_rank(self):
+        """Mean 1-based position per alternative."""
+        positions = np.arange(1, len(self.names) + 1)
+        return dict(zip(self.names, (self.rank_probabilities() @ positions).tolist()))
+
+    def stability(self):
+        """Probability that each alternative keeps its point-estimate position."""
+        probs = self.rank_probabilities()
+        return {self.names[a]: float(probs[a, k]) for k, a in enumerate(self.base_order)}
+
+    def to_dict(self):
+        return {
+            "n_samples": self.n_samples,
+            "base_ranking": [self.names[a] for a in self.base_order],
+            "p_best": self.p_best(),
+            "expected_rank": self.expected_rank(),
+            "rank_stability": self.stability(),
+            "closeness_mean": dict(zip(self.names, self.closeness_mean.tolist())),
+            "closeness_std": dict(zip(self.names, self.closeness_std.tolist())),
+        }
+
+
+class SensitivityAnalysis:
+    """
+    Monte Carlo sensitivity of the TOPSIS ranking to criteria-weight uncertainty.
+
+    Weight vectors are sampled either from the (T, I, F) judgment ranges
+    ("tnn") or from a Dirichlet around the AHP weights ("dirichlet"), then
+    all samples are ranked in chunked batch evaluations, optionally split
+    across worker processes.
+    """
+
+    def __init__(self, criteria, benefit_flags, tnn_judgments=None, weights=None, method="mean", seed=None):
+        self.criteria = criteria
+        self.benefit_flags = benefit_flags
+        self.tnn_judgments = tnn_judgments
+        self.weights = None if weights is None else np.asarray(weights, dtype=float)
+        self.method = method
+        self.rng = np.random.default_rng(seed)
+
+    def sample_weights(self, n_samples, mode="tnn", concentration=100.0):
+        if mode == "tnn":
+            if not self.tnn_judgments:
+                raise ValueError("TNN sampling needs tnn_judgments")
+            return sample_tnn_weights(self.criteria, self.tnn_judgments, n_samples, self.method, self.rng)[0]
+        if mode == "dirichlet":
+            if self.weights is None:
+                raise ValueError("Dirichlet sampling needs the point-estimate weights")
+            return sample_dirichlet_weights(self.weights, n_samples, concentration, self.rng)
+        raise ValueError(f"Unknown sampling mode {mode!r}; expected one of {SAMPLING_MODES}")
+
+    def run(self, names, matrix, n_samples=10_000, mode="tnn", concentration=100.0,
+            processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Rank `matrix` under n_samples weight draws; processes > 1 splits chunks over a pool."""
+        matrix = np.asarray(matrix, dtype=float)
+        benefit = benefit_mask(self.criteria, self.benefit_flags)
+        samples = self.sample_weights(n_samples, mode, concentration)
+        chunks = [(matrix, samples[i:i + chunk_size], benefit) for i in range(0, n_samples, chunk_size)]
+
+        if processes and processes > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                parts = list(pool.map(_rank_chunk, chunks))
+        else:
+            parts = [_rank_chunk(chunk) for chunk in chunks]
+
+        counts = sum(p[0] for p in parts)
+        closeness_sum = sum(p[1] for p in parts)
+        closeness_sumsq = sum(p[2] for p in parts)
+        base_weights = self.weights if self.weights is not None else samples.mean(axis=0)
+        base = closeness_samples(matrix, base_weights[np.newaxis], benefit)[0]
+        base_order = np.argsort(np.where(np.isnan(base), np.inf, -base), kind="stable")
+        return SensitivityResult(names, counts, closeness_sum, closeness_sumsq, base_order)
@@ -0,0 +1,112 @@
+# CORE/base_engine/py/shipment_stream.py
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import json
+from pathlib import Path
+
+DEFAULT_CHUNK_SIZE = 10_000
+READ_BLOCK_SIZE = 1 << 20  # 1 MiB of text per read
+
+
+def iter_json_array(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """
+    Yield lists of up to chunk_size records from a top-level JSON array
+
+    Objects are decoded one at a time with JSONDecoder.raw_decode, so only
+    the current read block and chunk are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunk: List[Dict] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and separators between elements
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = f.read(READ_BLOCK_SIZE), 0
+                eof = not buffer
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"{path} does not contain a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                break
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # Element straddles the read block: extend the buffer and retry
+                more = f.read(READ_BLOCK_SIZE)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            chunk.append(record)
+            pos = end
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_json_lines(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """Yield lists of up to chunk_size records from a JSON Lines file"""
+    chunk: List[Dict] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_parquet(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 columns: Optional[Sequence[str]] = None, filters=None) -> Iterator[List[Dict]]:
+    """
+    Yield lists of up to chunk_size records from a Parquet file, one record batch at a time
+    columns/filters are pushed down to the Arrow reader (see arrow_io)
+    """
+    from arrow_io import iter_parquet_batches
+
+    for batch in iter_parquet_batches(path, chunk_size, columns=columns, filters=filters):
+        yield batch.to_pylist()
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """'parquet', 'jsonl' or 'json' from the extension, falling back to the first byte"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(4096).lstrip()
+    return 'json' if head.startswith('[') else 'jsonl'
+
+
+def iter_shipment_chunks(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         fmt: Optional[str] = None, **kwargs) -> Iterator[List[Dict]]:
+    """Stream shipment records from a JSON array, JSON Lines or Parquet file in fixed-size chunks"""
+    fmt = fmt or detect_format(path)
+    readers = {'json': iter_json_array, 'jsonl': iter_json_lines, 'parquet': iter_parquet}
+    if fmt not in readers:
+        raise ValueError(f"Unsupported shipment format {fmt!r}")
+    return readers[fmt](path, chunk_size=chunk_size, **kwargs)
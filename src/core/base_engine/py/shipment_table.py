@@ -0,0 +1,169 @@
+# CORE/base_engine/py/shipment_table.py
+from typing import Dict, Iterable, List, Optional, Union
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from date_normalizer import parse_date_column
+
+
+# Source field(s) feeding each column, first match wins. Covers both the
+# public/shipments.json export and base_data/deeptrack_3.json.
+FIELD_SOURCES = {
+    'request_reference': ('request_reference',),
+    'origin_country': ('origin_country',),
+    'destination_country': ('destination_country',),
+    'mode_of_shipment': ('mode_of_shipment',),
+    'item_category': ('item_category',),
+    'delivery_status': ('delivery_status',),
+    'forwarder': ('final_quote_awarded_freight_forwader_Carrier', 'final_quote_awarded'),
+    'initial_forwarder': ('initial_quote_awarded',),
+    'carrier': ('carrier',),
+    'date_of_collection': ('date_of_collection',),
+    'date_of_arrival_destination': ('date_of_arrival_destination',),
+    'weight_kg': ('weight_kg',),
+    'volume_cbm': ('volume_cbm',),
+    'cost': ('carrier+cost',),  # only for exports without per-forwarder quote columns (see _awarded_cost)
+}
+
+CATEGORICAL_COLUMNS = (
+    'origin_country', 'destination_country', 'mode_of_shipment', 'item_category',
+    'delivery_status', 'forwarder', 'initial_forwarder', 'carrier',
+)
+DATE_COLUMNS = ('date_of_collection', 'date_of_arrival_destination')
+FLOAT_COLUMNS = ('weight_kg', 'volume_cbm', 'cost')
+
+
+def parse_numeric(values: Union[pd.Series, Iterable], dtype=np.float32) -> np.ndarray:
+    """Parse '$18,681.00', '29972.00 kg', '14,397.00' or numbers into float32 (or `dtype`); junk -> NaN"""
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    parsed = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    # Only text that is not already a plain number ('1e-05' is) gets its units and separators stripped
+    text = np.isnan(parsed) & series.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    if text.any():
+        cleaned = series[text].str.replace(r'[^0-9.\-]', '', regex=True)
+        parsed[text] = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=np.float64)
+    return parsed.astype(dtype)
+
+
+def parse_dates(values: Union[pd.Series, Iterable]) -> np.ndarray:
+    """Parse a date column into day-precision datetime64; unparseable entries become NaT"""
+    return parse_date_column(values)
+
+
+class ShipmentTable:
+    """
+    Columnar view of shipment history, parsed once from the raw JSON records
+
+    Dates are datetime64 at day precision, weights/volumes/costs float64 and the
+    country/mode/forwarder fields pandas categoricals (int codes + labels).
+    """
+
+    def __init__(self, frame: pd.DataFrame, source: Optional[Path] = None):
+        self.frame = frame
+        self.source = source
+
+    @classmethod
+    def from_records(cls, records: List[Dict], source: Optional[Path] = None) -> 'ShipmentTable':
+        return cls.from_frame(pd.DataFrame.from_records(records), source=source)
+
+    @classmethod
+    def from_frame(cls, raw: pd.DataFrame, source: Optional[Path] = None) -> 'ShipmentTable':
+        """Build from a raw export frame (string or already-typed source columns)"""
+        columns = {}
+        for column, fields in FIELD_SOURCES.items():
+            values = cls._first_present(raw, fields)
+            if column in CATEGORICAL_COLUMNS:
+                columns[column] = pd.Categorical(values.where(values.notna() & (values != ''), None))
+            elif column in DATE_COLUMNS:
+                columns[column] = parse_dates(values)
+            elif column == 'cost':
+                columns[column] = cls._awarded_cost(raw, columns['forwarder'], values)
+            elif column in FLOAT_COLUMNS:
+                columns[column] = parse_numeric(values, dtype=np.float64)
+            else:
+                columns[column] = values.astype(object).to_numpy()
+        return cls(pd.DataFrame(columns), source=source)
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path]) -> 'ShipmentTable':
+        path = Path(path)
+        with open(path, 'r') as f:
+            return cls.from_records(json.load(f), source=path)
+
+    @classmethod
+    def from_parquet(cls, path: Union[str, Path], filters=None) -> 'ShipmentTable':
+        """
+        Read a Parquet export through Arrow, projecting only the source fields
+        the table uses and pushing `filters` down to the row groups, e.g.
+        arrow_io.shipment_filter(path, modes=['Air'], year=2024)
+        """
+        from arrow_io import read_parquet_table
+        from quote_matrix import FORWARDER_COLUMNS
+
+        path = Path(path)
+        fields = sorted({f for sources in FIELD_SOURCES.values() for f in sources}
+                        | {c for columns in FORWARDER_COLUMNS.values() for c in columns})
+        table = read_parquet_table(path, columns=fields, filters=filters)
+        return cls.from_frame(table.to_pandas(), source=path)
+
+    @staticmethod
+    def _awarded_cost(raw: pd.DataFrame, awarded: pd.Categorical, fallback: pd.Series) -> np.ndarray:
+        """The awarded forwarder's quote per row, as DataUtils.calculate_cost_efficiency reads it"""
+        from quote_matrix import FORWARDER_COLUMNS, canonical_forwarder, parse_quotes
+
+        if not any(c in raw for columns in FORWARDER_COLUMNS.values() for c in columns):
+            return parse_numeric(fallback, dtype=np.float64)
+        canonical = np.array([canonical_forwarder(name) for name in awarded.categories] + [None],
+                             dtype=object)[awarded.codes]
+        cost = np.full(len(raw), np.nan)
+        for forwarder, columns in FORWARDER_COLUMNS.items():
+            rows = canonical == forwarder
+            column = next((c for c in columns if c in raw), None)
+            if column is not None and rows.any():
+                cost[rows] = parse_quotes(raw[column].to_numpy(dtype=object)[rows], dtype=np.float64)
+        return cost
+
+    @staticmethod
+    def _first_present(raw: pd.DataFrame, fields) -> pd.Series:
+        result = pd.Series([None] * len(raw), index=raw.index, dtype=object)
+        for field in reversed(fields):
+            if field in raw:
+                result = raw[field].where(raw[field].notna(), result)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Raw column values: codes for categoricals, typed arrays otherwise"""
+        if column in CATEGORICAL_COLUMNS:
+            return self.codes(column)
+        return self.frame[column].to_numpy()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.frame.columns)
+
+    def codes(self, column: str) -> np.ndarray:
+        """Integer category codes (-1 for missing)"""
+        return self.frame[column].cat.codes.to_numpy()
+
+    def categories(self, column: str) -> np.ndarray:
+        return self.frame[column].cat.categories.to_numpy()
+
+    def labels(self, column: str) -> np.ndarray:
+        """Category labels per row, None where missing (as the record dicts have it)"""
+        values = self.frame[column].astype(object)
+        return values.where(values.notna(), None).to_numpy()
+
+    def take(self, rows: np.ndarray) -> 'ShipmentTable':
+        """Subset by boolean mask or integer index, keeping category dictionaries"""
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return ShipmentTable(self.frame.iloc[rows].reset_index(drop=True), source=self.source)
+
+    def memory_usage(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum())
@@ -0,0 +1,134 @@
+# CORE/base_engine/py/shipment_validator.py
+from typing import Dict, Iterable, List, Optional, Union
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from shipment_table import parse_dates
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / 'base_schema' / 'shipmentsField.json'
+
+ERROR_COLUMNS = ['row', 'field', 'reason']
+
+
+class ValidationReport:
+    """
+    Result of a bulk validation run
+
+    valid:  bool array, one entry per input row
+    errors: DataFrame with one (row, field, reason) line per failed check
+    """
+
+    def __init__(self, valid: np.ndarray, errors: pd.DataFrame):
+        self.valid = valid
+        self.errors = errors
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    @property
+    def n_valid(self) -> int:
+        return int(self.valid.sum())
+
+    @property
+    def n_invalid(self) -> int:
+        return len(self.valid) - self.n_valid
+
+    def bitmask(self) -> np.ndarray:
+        """Validity packed eight rows per byte"""
+        return np.packbits(self.valid)
+
+    def reasons(self) -> pd.Series:
+        """Failure counts per (field, reason)"""
+        return self.errors.groupby(['field', 'reason']).size()
+
+    def summary(self) -> str:
+        return f"{self.n_valid}/{len(self)} shipments valid, {len(self.errors)} failed checks"
+
+
+class ShipmentValidator:
+    """
+    Column-at-a-time validator driven by base_schema/shipmentsField.json
+
+    Each field is checked over the whole column at once. Supported types are
+    string, number, boolean and ISO8601 (any parseable date, since the
+    deeptrack exports use e.g. 11-Jan-24). `rules` adds value checks as
+    field -> (vectorised predicate, reason).
+    """
+
+    def __init__(self, required_fields: Iterable[str], field_types: Dict[str, str],
+                 rules: Optional[Dict[str, tuple]] = None):
+        self.required_fields = list(required_fields)
+        self.field_types = dict(field_types)
+        self.rules = rules or {}
+
+    @classmethod
+    def from_schema(cls, path: Union[str, Path] = SCHEMA_PATH,
+                    required_fields: Optional[Iterable[str]] = None,
+                    rules: Optional[Dict[str, tuple]] = None) -> 'ShipmentValidator':
+        with open(path, 'r') as f:
+            schema = json.load(f)
+        required = list(required_fields) if required_fields is not None else schema.get('requiredFields', [])
+        types = schema.get('fieldTypes', {})
+        field_types = {field: types.get(field, 'string') for field in required}
+        return cls(required, field_types, rules)
+
+    def validate(self, shipments: Union[List[Dict], pd.DataFrame]) -> ValidationReport:
+        if isinstance(shipments, pd.DataFrame):
+            frame = shipments
+        else:
+            # Only materialise the checked fields; absent keys read as missing
+            frame = pd.DataFrame(
+                {field: [s.get(field) for s in shipments] for field in self.required_fields},
+                index=pd.RangeIndex(len(shipments)),
+            )
+        n = len(frame)
+        valid = np.ones(n, dtype=bool)
+        errors = []
+
+        def fail(field: str, mask: np.ndarray, reason: str):
+            rows = np.flatnonzero(mask)
+            if rows.size:
+                valid[rows] = False
+                errors.append(pd.DataFrame({'row': rows, 'field': field, 'reason': reason}))
+
+        for field in self.required_fields:
+            if field not in frame:
+                fail(field, np.ones(n, dtype=bool), 'missing')
+                continue
+            column = frame[field]
+            missing = column.isna().to_numpy()
+            fail(field, missing, 'missing')
+            bad_type = ~missing & ~self._type_ok(column, self.field_types.get(field, 'string'))
+            fail(field, bad_type, f"not {self.field_types.get(field, 'string')}")
+            rule = self.rules.get(field)
+            if rule is not None:
+                predicate, reason = rule
+                checkable = ~missing & ~bad_type
+                if checkable.any():
+                    ok = np.ones(n, dtype=bool)
+                    ok[checkable] = np.asarray(predicate(column[checkable]), dtype=bool)
+                    fail(field, ~ok, reason)
+
+        error_table = (
+            pd.concat(errors, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+            if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+        )
+        return ValidationReport(valid, error_table)
+
+    @staticmethod
+    def _type_ok(column: pd.Series, field_type: str) -> np.ndarray:
+        if field_type == 'number':
+            if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+                return np.ones(len(column), dtype=bool)
+            kinds = column.map(type)
+            return kinds.isin((int, float, np.integer, np.floating)).to_numpy()
+        if field_type == 'boolean':
+            return column.map(type).eq(bool).to_numpy()
+        if field_type == 'ISO8601':
+            is_text = column.map(type).eq(str).to_numpy()
+            parsed = ~np.isnat(parse_dates(column.where(is_text, None)))
+            return is_text & parsed
+        return column.map(type).eq(str).to_numpy()
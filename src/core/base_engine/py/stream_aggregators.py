@@ -0,0 +1,204 @@
+# CORE/base_engine/py/stream_aggregators.py
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from group_engine import DEFAULT_PERCENTILES
+
+
+class TDigest:
+    """
+    Mergeable t-digest for streaming percentiles
+
+    Values are added a chunk at a time; each add/merge re-clusters the
+    centroids in one vectorised pass using the arcsine scale function, so
+    memory stays O(compression) regardless of how many values were seen.
+    """
+
+    def __init__(self, compression: float = 200.0):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: Iterable[float]) -> 'TDigest':
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(values.size)]))
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def quantile(self, q: float) -> float:
+        if not self.weights.size:
+            return float('nan')
+        total = self.weights.sum()
+        mids = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[0.0], mids, [total]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * total, xs, ys))
+
+    def percentile(self, p: float) -> float:
+        return self.quantile(p / 100.0)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        bucket = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+
+class RunningMoments:
+    """
+    Mergeable count / mean / M2 for mean and population std
+
+    Chunks are folded in with Welford's update generalised to batches
+    (Chan et al.), which avoids the cancellation of sum-of-squares.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> 'RunningMoments':
+        if values.size:
+            chunk_mean = float(values.mean())
+            self._combine(int(values.size), chunk_mean, float(np.square(values - chunk_mean).sum()))
+        return self
+
+    def merge(self, other: 'RunningMoments') -> 'RunningMoments':
+        if other.count:
+            self._combine(other.count, other._mean, other.m2)
+        return self
+
+    def _combine(self, count: int, mean: float, m2: float):
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def mean(self) -> float:
+        return self._mean if self.count else 0.0
+
+    def std(self) -> float:
+        if not self.count:
+            return float('nan')
+        return float(np.sqrt(self.m2 / self.count))
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    """Truthy metric values, mirroring the `if cost_eff:` filters in DataUtils"""
+    return ~np.isnan(values) & (values != 0)
+
+
+class ModeEfficiencyAggregator:
+    """
+    Chunk-mergeable equivalent of DataUtils.calculate_mode_efficiency
+
+    Transit percentiles come from a per-mode t-digest, so they are close to
+    but not bit-identical with the in-memory quantiles.
+    """
+
+    def __init__(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, compression: float = 200.0):
+        self.percentiles = tuple(percentiles)
+        self.compression = compression
+        self.modes: Dict[str, Dict] = {}
+
+    def _state(self, mode) -> Dict:
+        if mode not in self.modes:
+            self.modes[mode] = {
+                'count': 0,
+                'total_cost': 0.0,
+                'total_weight': 0.0,
+                'transit': RunningMoments(),
+                'transit_digest': TDigest(self.compression),
+                'cost_eff': RunningMoments(),
+                'on_time_count': 0,
+            }
+        return self.modes[mode]
+
+    def update(self, metrics: Dict[str, np.ndarray]) -> 'ModeEfficiencyAggregator':
+        """metrics: equal-length arrays 'mode', 'cost_eff', 'weight', 'transit', 'on_time'"""
+        modes = np.asarray(metrics['mode']).astype(str)
+        has_cost = _present(metrics['cost_eff'])
+        has_transit = _present(metrics['transit'])
+        for mode in np.unique(modes):
+            rows = modes == mode
+            state = self._state(mode)
+            cost_rows = rows & has_cost
+            state['count'] += int(rows.sum())
+            state['total_cost'] += float((metrics['cost_eff'][cost_rows] * metrics['weight'][cost_rows]).sum())
+            state['total_weight'] += float(metrics['weight'][cost_rows].sum())
+            state['transit'].update(metrics['transit'][rows & has_transit])
+            state['transit_digest'].update(metrics['transit'][rows & has_transit])
+            state['cost_eff'].update(metrics['cost_eff'][cost_rows])
+            state['on_time_count'] += int(metrics['on_time'][rows].sum())
+        return self
+
+    def merge(self, other: 'ModeEfficiencyAggregator') -> 'ModeEfficiencyAggregator':
+        for mode, theirs in other.modes.items():
+            state = self._state(mode)
+            for key in ('count', 'total_cost', 'total_weight', 'on_time_count'):
+                state[key] += theirs[key]
+            state['transit'].merge(theirs['transit'])
+            state['transit_digest'].merge(theirs['transit_digest'])
+            state['cost_eff'].merge(theirs['cost_eff'])
+        return self
+
+    def result(self) -> Dict:
+        return {
+            mode: {
+                'shipment_count': s['count'],
+                'avg_cost_per_kg': s['total_cost'] / s['total_weight'] if s['total_weight'] > 0 else 0,
+                'avg_transit_days': s['transit'].mean(),
+                'transit_std_dev': s['transit'].std(),
+                'transit_percentiles': {f"p{p:g}": s['transit_digest'].percentile(p) for p in self.percentiles},
+                'on_time_rate': s['on_time_count'] / s['count'] if s['count'] > 0 else 0,
+                'cost_std_dev': s['cost_eff'].std(),
+            }
+            for mode, s in self.modes.items()
+        }
+
+
+class AnomalyThresholdAggregator:
+    """Streaming percentile thresholds per anomaly metric via t-digests"""
+
+    def __init__(self, metrics: Iterable[str] = ('high_cost', 'long_transit'), compression: float = 200.0):
+        self.digests = {name: TDigest(compression) for name in metrics}
+
+    def update(self, metrics: Dict[str, np.ndarray]) -> 'AnomalyThresholdAggregator':
+        for name, digest in self.digests.items():
+            values = np.asarray(metrics[name], dtype=np.float64)
+            digest.update(values[_present(values)])
+        return self
+
+    def merge(self, other: 'AnomalyThresholdAggregator') -> 'AnomalyThresholdAggregator':
+        for name, digest in self.digests.items():
+            digest.merge(other.digests[name])
+        return self
+
+    def thresholds(self, percentile: float = 95.0) -> Optional[Dict[str, float]]:
+        if any(not d.weights.size for d in self.digests.values()):
+            return None
+        return {name: d.percentile(percentile) for name, d in self.digests.items()}
@@ -0,0 +1,182 @@
+# CORE/base_engine/py/trend_engine.py
+from typing import Dict, Hashable, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Per-shipment metric -> name reported by calculate_historical_trends
+TREND_METRICS = {
+    'on_time': 'on_time_rate',
+    'transit_days': 'avg_transit_days',
+    'cost_eff': 'cost_efficiency',
+}
+
+ALL = '__all__'
+
+
+def window_days(window: Union[str, int]) -> int:
+    """'7D' / '30D' / 90 -> whole days"""
+    if isinstance(window, (int, np.integer)):
+        days = int(window)
+    else:
+        days = pd.Timedelta(window).days
+    if days < 1:
+        raise ValueError(f"Trend window must be at least one day, got {window!r}")
+    return days
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class TrendEngine:
+    """
+    Daily running sums and counts per metric, optionally split by a grouping key
+
+    Buckets live in dense (group, day, metric) arrays indexed by day offset,
+    so appending shipments costs O(new rows) and any window (7D/30D/90D) is a
+    slice-sum over the buckets rather than a rescan of history. Rows are
+    also counted under ALL, so overall and per-group trends share one engine.
+    """
+
+    METRICS = tuple(TREND_METRICS)
+
+    def __init__(self, group_by: Optional[str] = None, capacity_days: int = 366):
+        self.group_by = group_by
+        self.origin: Optional[int] = None  # epoch day of bucket 0
+        self.last_day: Optional[int] = None
+        self.groups: Dict[Hashable, int] = {ALL: 0}
+        self.sums = np.zeros((1, capacity_days, len(self.METRICS)))
+        self.counts = np.zeros((1, capacity_days, len(self.METRICS)))
+        self.rows = 0
+
+    # --- Appending -----------------------------------------------------------
+
+    def update(self, metrics: Dict[str, np.ndarray]) -> 'TrendEngine':
+        """
+        metrics: 'day' (epoch days) plus one array per METRICS entry, and the
+        group labels under metrics[group_by] when the engine is grouped
+        """
+        day = np.asarray(metrics['day'], dtype=np.float64)
+        known = ~np.isnan(day)
+        if not known.any():
+            return self
+        days = day[known].astype(np.int64)
+        values = np.column_stack([np.asarray(metrics[m], dtype=np.float64) for m in self.METRICS])[known]
+        present = ~np.isnan(values)
+        self._reserve(int(days.min()), int(days.max()))
+        offsets = days - self.origin
+        sums = np.where(present, values, 0.0)
+        counts = present.astype(np.float64)
+
+        np.add.at(self.sums[0], offsets, sums)
+        np.add.at(self.counts[0], offsets, counts)
+        if self.group_by is not None:
+            labels = np.asarray(metrics[self.group_by], dtype=object)[known]
+            group_index = self._group_indices(labels)
+            np.add.at(self.sums, (group_index, offsets), sums)
+            np.add.at(self.counts, (group_index, offsets), counts)
+
+        self.rows += int(known.sum())
+        return self
+
+    def merge(self, other: 'TrendEngine') -> 'TrendEngine':
+        """Fold another engine's buckets into this one (e.g. from a parallel chunk)"""
+        if other.group_by != self.group_by:
+            raise ValueError(f"Cannot merge trends grouped by {other.group_by!r} into {self.group_by!r}")
+        if other.origin is None:
+            return self
+        self._reserve(other.origin, other.last_day)
+        span = other.last_day - other.origin + 1
+        start = other.origin - self.origin
+        index = self._group_indices(np.asarray(list(other.groups), dtype=object))
+        used = len(other.groups)
+        self.sums[index, start:start + span] += other.sums[:used, :span]
+        self.counts[index, start:start + span] += other.counts[:used, :span]
+        self.rows += other.rows
+        return self
+
+    def _reserve(self, first: int, last: int):
+        """Grow the day axis (doubling) so [first, last] has buckets"""
+        if self.origin is None:
+            self.origin, self.last_day = first, last
+        shift = max(self.origin - first, 0)
+        needed = max(last, self.last_day) - min(first, self.origin) + 1
+        capacity = self.sums.shape[1]
+        if shift or needed > capacity:
+            while needed > capacity:
+                capacity *= 2
+            self.sums = self._resized(self.sums, self.sums.shape[0], capacity, shift)
+            self.counts = self._resized(self.counts, self.counts.shape[0], capacity, shift)
+            self.origin -= shift
+        self.last_day = max(last, self.last_day)
+
+    def _group_indices(self, labels: np.ndarray) -> np.ndarray:
+        unique, inverse = np.unique(labels.astype(str), return_inverse=True)
+        for label in unique.tolist():
+            if label not in self.groups:
+                self.groups[label] = len(self.groups)
+        if len(self.groups) > self.sums.shape[0]:
+            rows = max(len(self.groups), 2 * self.sums.shape[0])
+            self.sums = self._resized(self.sums, rows, self.sums.shape[1], 0)
+            self.counts = self._resized(self.counts, rows, self.counts.shape[1], 0)
+        return np.array([self.groups[label] for label in unique.tolist()], dtype=np.intp)[inverse]
+
+    @staticmethod
+    def _resized(buckets: np.ndarray, groups: int, days: int, shift: int) -> np.ndarray:
+        grown = np.zeros((groups, days, buckets.shape[2]))
+        used = min(buckets.shape[1], days - shift)
+        grown[:buckets.shape[0], shift:shift + used] = buckets[:, :used]
+        return grown
+
+    # --- Queries -------------------------------------------------------------
+
+    def window_mean(self, start_day: int, end_day: int, group: Hashable = ALL) -> Dict[str, float]:
+        """Per-metric mean over collection days in [start_day, end_day]; NaN where empty"""
+        if self.origin is None or group not in self.groups:
+            return dict.fromkeys(self.METRICS, float('nan'))
+        g = self.groups[group]
+        lo = max(start_day - self.origin, 0)
+        hi = min(end_day - self.origin, self.last_day - self.origin) + 1
+        if hi <= lo:
+            return dict.fromkeys(self.METRICS, float('nan'))
+        sums = self.sums[g, lo:hi].sum(axis=0)
+        counts = self.counts[g, lo:hi].sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        return dict(zip(self.METRICS, means.tolist()))
+
+    def trends(self, window: Union[str, int] = '30D', group: Hashable = ALL,
+               end_day: Optional[int] = None) -> Dict:
+        """
+        Latest window vs the window before it, per metric:
+            {'on_time_rate': {'current': .., 'trend': .., 'percent_change': ..}, ...}
+        Windows end at end_day (default: the latest collection day seen).
+        Empty windows give None, and percent_change is None when the previous
+        window's value is missing or zero.
+        """
+        if self.origin is None or group not in self.groups:
+            return {}
+        days = window_days(window)
+        last = self.last_day if end_day is None else int(end_day)
+        current = self.window_mean(last - days + 1, last, group)
+        previous = self.window_mean(last - 2 * days + 1, last - days, group)
+        results = {}
+        for metric, name in TREND_METRICS.items():
+            now, before = _finite(current[metric]), _finite(previous[metric])
+            trend = now - before if now is not None and before is not None else None
+            results[name] = {
+                'current': now,
+                'trend': trend,
+                'percent_change': trend / before * 100 if trend is not None and before else None
+            }
+        return results
+
+    def trends_by_group(self, window: Union[str, int] = '30D', end_day: Optional[int] = None) -> Dict:
+        """trends() for every group label, over the same calendar windows"""
+        last = self.last_day if end_day is None else end_day
+        return {group: self.trends(window, group, last) for group in self.groups if group != ALL}
+
+    @property
+    def labels(self) -> Iterable[Hashable]:
+        return [group for group in self.groups if group != ALL]
@@ -14,11 +14,25 @@ def load_decision_matrix(path='data/decision_matrix.csv'):
         ])
     with open(path, 'r') as file:
         reader = csv.reader(file)
-        return np.array([[float(cell) for cell in row] for row in reader])
+        return np.array([[_parse_cell(cell) for cell in row] for row in reader])
 
 
-def validate_input(matrix):
-    return isinstance(matrix, np.ndarray) and matrix.ndim == 2 and not np.isnan(matrix).any()
+def _parse_cell(cell):
+    """'1,200' / '$18,681.00' -> float; 'No Quote', blanks and junk -> NaN (missing)"""
+    try:
+        return float(cell.replace(',', '').replace('$', '').strip())
+    except ValueError:
+        return np.nan
+
+
+def validate_input(matrix, allow_missing=False):
+    """2-D numeric matrix; NaN cells only pass with allow_missing (for the masked TOPSIS mode)"""
+    if not (isinstance(matrix, np.ndarray) and matrix.ndim == 2):
+        return False
+    missing = np.isnan(matrix)
+    if allow_missing:
+        return not missing.all()
+    return not missing.any()
 
 
 def log_decision(criteria, weights, results, timestamp):
@@ -0,0 +1,106 @@
+# deepcal_engine/weight_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def judgment_key(criteria, tnn_judgments, method="mean"):
+    """Content hash of the criteria order, the (T, I, F) judgments and the solver."""
+    pairs = sorted(
+        [str(a), str(b), [float(v) for v in tnn]]
+        for (a, b), tnn in tnn_judgments.items()
+    )
+    payload = json.dumps(
+        {"criteria": [str(c) for c in criteria], "judgments": pairs, "method": method},
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class WeightCache:
+    """
+    Content-addressed cache for neutrosophic AHP weights.
+
+    Bounded LRU in memory, optionally backed by one JSON file per key in
+    `disk_dir` so separate CLI invocations share results. Hit/miss counters
+    are available through stats(). Safe to share between threads (the
+    ranking API's worker pool does); a weight vector computed by two threads
+    at once is simply stored twice.
+    """
+
+    def __init__(self, maxsize=256, disk_dir=None):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get_or_compute(self, criteria, tnn_judgments, compute, method="mean"):
+        key = judgment_key(criteria, tnn_judgments, method)
+        weights = self._lookup(key)
+        if weights is None:
+            with self._lock:
+                self.misses += 1
+            weights = np.asarray(compute(), dtype=float)
+            self._store(key, weights)
+        return weights.copy()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    weights = np.asarray(json.load(f)["weights"], dtype=float)
+            except (OSError, ValueError, KeyError):
+                return None
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, weights)
+            return weights
+        return None
+
+    def _store(self, key, weights):
+        self._remember(key, weights)
+        path = self._path(key)
+        if path:
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"weights": weights.tolist()}, f)
+            os.replace(tmp, path)
+
+    def _remember(self, key, weights):
+        with self._lock:
+            self._entries[key] = weights
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json") if self.disk_dir else None
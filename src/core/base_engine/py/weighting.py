@@ -1,27 +1,113 @@
 # deepcal_engine/weighting.py
 import numpy as np
 
+# Saaty's random consistency index for n = 1..15
+RANDOM_INDEX = [0.0, 0.0, 0.58, 0.90, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49, 1.51, 1.48, 1.56, 1.57, 1.59]
+
+SOLVERS = ("mean", "eigen", "geometric")
+
+
 class CriteriaWeighting:
-    def __init__(self, criteria, tnn_judgments):
+    def __init__(self, criteria, tnn_judgments, cache=None, method="mean"):
+        if method not in SOLVERS:
+            raise ValueError(f"Unknown AHP solver {method!r}; expected one of {SOLVERS}")
         self.criteria = criteria
         self.tnn_judgments = tnn_judgments
+        self.cache = cache
+        self.method = method
 
     def score_tnn(self, tnn):
         # Basic neutrosophic scoring: S = T - F
         return tnn[0] - tnn[2]
 
-    def compute_weights(self):
+    def comparison_matrix(self, tnn_judgments=None):
         n = len(self.criteria)
         comparison = np.ones((n, n))
         index = {c: i for i, c in enumerate(self.criteria)}
 
-        for (a, b), tnn in self.tnn_judgments.items():
+        for (a, b), tnn in (self.tnn_judgments if tnn_judgments is None else tnn_judgments).items():
             i, j = index[a], index[b]
             s = self.score_tnn(tnn)
             val = 1 + s if s >= 0 else 1 / (1 - s)
             comparison[i, j] = val
             comparison[j, i] = 1 / val
+        return comparison
+
+    def compute_weights(self):
+        if self.cache is not None:
+            return self.cache.get_or_compute(
+                self.criteria, self.tnn_judgments, self._compute_weights,
+                method=f"{type(self).__qualname__}:{self.method}",
+            )
+        return self._compute_weights()
+
+    def solve(self):
+        """Return (weights, consistency_ratio) for the configured solver."""
+        weights, cr = solve_batch(self.comparison_matrix()[np.newaxis], self.method)
+        return weights[0], float(cr[0])
+
+    def consistency_ratio(self, weights=None):
+        comparison = self.comparison_matrix()
+        if weights is None:
+            weights = self.compute_weights()
+        lam = lambda_max(comparison[np.newaxis], np.asarray(weights)[np.newaxis])
+        return float(consistency_ratio(lam, len(self.criteria))[0])
+
+    def batch_weights(self, judgment_sets):
+        """Weights and consistency ratios for many stakeholders' judgment sets at once."""
+        matrices = np.stack([self.comparison_matrix(j) for j in judgment_sets])
+        return solve_batch(matrices, self.method)
+
+    def _compute_weights(self):
+        return self.solve()[0]
+
+
+def solve_batch(matrices, method="mean", tol=1e-10, max_iter=1000):
+    """
+    Derive weights from a stack of (batch x n x n) pairwise comparison matrices.
+
+    Returns (weights, consistency_ratio) with shapes (batch x n) and (batch,).
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    if method == "mean":
+        weights = (matrices / matrices.sum(axis=1, keepdims=True)).mean(axis=2)
+        lam = lambda_max(matrices, weights)
+    elif method == "geometric":
+        weights = np.exp(np.log(matrices).mean(axis=2))
+        weights /= weights.sum(axis=1, keepdims=True)
+        lam = lambda_max(matrices, weights)
+    elif method == "eigen":
+        weights, lam = power_iteration(matrices, tol=tol, max_iter=max_iter)
+    else:
+        raise ValueError(f"Unknown AHP solver {method!r}; expected one of {SOLVERS}")
+    return weights, consistency_ratio(lam, matrices.shape[-1])
+
+
+def power_iteration(matrices, tol=1e-10, max_iter=1000):
+    """Principal eigenvector of each matrix, iterating only the unconverged ones."""
+    n_batch, n, _ = matrices.shape
+    weights = np.full((n_batch, n), 1.0 / n)
+    active = np.arange(n_batch)
+    for _ in range(max_iter):
+        nxt = np.einsum("bij,bj->bi", matrices[active], weights[active])
+        nxt /= nxt.sum(axis=1, keepdims=True)
+        delta = np.abs(nxt - weights[active]).max(axis=1)
+        weights[active] = nxt
+        active = active[delta > tol]
+        if not active.size:
+            break
+    return weights, lambda_max(matrices, weights)
+
+
+def lambda_max(matrices, weights):
+    """Principal eigenvalue estimate mean((A w)_i / w_i) per matrix."""
+    return (np.einsum("bij,bj->bi", matrices, weights) / weights).mean(axis=1)
+
 
-        normalized = comparison / comparison.sum(axis=0)
-        weights = normalized.mean(axis=1)
-        return weights
+def consistency_ratio(lam, n):
+    """Saaty CR = CI / RI; RI beyond 15 criteria follows Alonso & Lamata's fit."""
+    if n < 3:
+        return np.zeros_like(np.asarray(lam, dtype=float))
+    ci = (np.asarray(lam, dtype=float) - n) / (n - 1)
+    ri = RANDOM_INDEX[n - 1] if n <= len(RANDOM_INDEX) else (1.7699 * n - 4.3513) / (n - 1)
+    return np.maximum(ci, 0.0) / ri